@@ -10,6 +10,8 @@ from backend.config import settings
 from backend.database.db import init_db
 from backend.logger import get_logger
 from backend.routes.main import api_router
+from backend.scrapers.browser import BrowserManager
+from backend.scrapers.runs import ScrapeRunManager
 
 logger = get_logger()
 
@@ -33,8 +35,19 @@ async def setup(inner_app: FastAPI) -> AsyncGenerator:
     loop = asyncio.get_event_loop()
     loop.set_exception_handler(handle_asyncio_exception)
 
+    browser_manager = BrowserManager(
+        size=settings.BROWSER_POOL_SIZE, headless=settings.HEADLESS
+    )
+    await browser_manager.start()
+    run_manager = ScrapeRunManager(browser_manager=browser_manager)
+    await run_manager.start()
+    inner_app.state.run_manager = run_manager
+
     yield
 
+    await run_manager.stop()
+    await browser_manager.stop()
+
 
 app = FastAPI(title=settings.PROJECT_NAME, debug=True, lifespan=setup)
 app.include_router(api_router)
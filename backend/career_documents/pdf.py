@@ -1,3 +1,4 @@
+import asyncio
 import os
 from pathlib import Path
 
@@ -102,7 +103,10 @@ async def _create_cover_letter(
     file_name = f"Letter_{converted_title}_{current_time}"
     cover_letter_path = path / f"{file_name}.pdf"
 
-    HTML(string=cover_letter.html).write_pdf(cover_letter_path)
+    # Rendering is CPU bound, so it runs in a thread to not block the scraping
+    await asyncio.to_thread(
+        HTML(string=cover_letter.html).write_pdf, cover_letter_path
+    )
     await _save_document_to_file(
         path, file_name=f"{file_name}.html", data=cover_letter.html
     )
@@ -198,7 +202,11 @@ async def _create_cv(
     file_name = f"CV_{converted_title}_{current_time}"
     cv_path = path / f"{file_name}.pdf"
 
-    HTML(string=cv.html).write_pdf(cv_path, stylesheets=[CSS(string=cv.css)])
+    await asyncio.to_thread(
+        HTML(string=cv.html).write_pdf,
+        cv_path,
+        stylesheets=[CSS(string=cv.css)],
+    )
     await _save_document_to_file(
         path=path, file_name=f"{file_name}.html", data=cv.html
     )
@@ -22,6 +22,41 @@ class Settings(BaseSettings):
     PDF_ENGINE: str = "weasyprint"
     DEBUG: bool = False
     HEADLESS: bool = False
+    BROWSER_POOL_SIZE: int = 1
+    BLOCK_REQUESTS: bool = True
+    BLOCKED_RESOURCE_TYPES: list[str] = ["image", "media", "font"]
+    BLOCKED_DOMAINS: list[str] = [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "googlesyndication.com",
+        "googleadservices.com",
+        "doubleclick.net",
+        "adservice.google.com",
+        "connect.facebook.net",
+        "hotjar.com",
+        "clarity.ms",
+        "criteo.com",
+        "taboola.com",
+        "outbrain.com",
+        "scorecardresearch.com",
+        "quantserve.com",
+        "segment.io",
+        "mixpanel.com",
+        "amplitude.com",
+        "newrelic.com",
+        "nr-data.net",
+    ]
+    MAX_CONCURRENT_WEBSITES: int = 3
+    PAGE_POOL_SIZE: int = 4
+    DETAIL_WORKERS: int = 4
+    EVALUATION_WORKERS: int = 4
+    DOCUMENT_WORKERS: int = 2
+    PIPELINE_QUEUE_SIZE: int = 20
+    PAGINATION_PREFETCH_PAGES: int = 0
+    HTML_PARSER: Literal["lxml", "html.parser"] = "lxml"
+    EXTRACT_ELEMENTS_IN_BROWSER: bool = False
+    PAGE_SNAPSHOT_DELTAS: bool = True
+    PAGE_VIEW_TOKEN_BUDGET: int = 4000
     LOG_TO_FILE: bool = True
     API_KEY: str
     OPENAI_API_KEY: str = ""
@@ -1,10 +1,13 @@
+import datetime
 from typing import Sequence, TypeVar
 
-from sqlmodel import Session, SQLModel, select
+from sqlmodel import Session, SQLModel, delete, select
 
+from backend.database.duplicates import job_entry_signature
 from backend.database.models import (
     CertificateModel,
     CharityModel,
+    CrawlCheckpointModel,
     EducationModel,
     ExperienceModel,
     JobEntryModel,
@@ -12,6 +15,8 @@ from backend.database.models import (
     LocationModel,
     ProgrammingLanguageModel,
     ProjectModel,
+    ScrapeRunEventModel,
+    ScrapeRunModel,
     SocialPlatformModel,
     ToolModel,
     UserModel,
@@ -20,6 +25,7 @@ from backend.database.models import (
 )
 from backend.logger import get_logger
 from backend.schemas.models import (
+    AutomationSteps,
     CandidateData,
     Certificate,
     Charity,
@@ -30,6 +36,7 @@ from backend.schemas.models import (
     Location,
     ProgrammingLanguage,
     Project,
+    ScrapeRunStatusEnum,
     SocialPlatform,
     Tool,
     User,
@@ -37,6 +44,7 @@ from backend.schemas.models import (
     UserPreferences,
     Website,
 )
+from backend.utils import canonicalize_url
 
 logger = get_logger()
 T = TypeVar("T", bound=SQLModel)
@@ -85,7 +93,9 @@ def update_user_preferences(
     record.cv_creation_mode = model.cv_creation_mode
     record.generate_cover_letter = model.generate_cover_letter
     record.cv_path = model.cv_path
-    record.retries = record.retries
+    record.retries = model.retries
+    record.website_budget = model.website_budget
+    record.run_budget = model.run_budget
     session.add(record)
     session.commit()
 
@@ -303,17 +313,185 @@ def get_user_needs(session: Session, user: UserModel) -> UserNeeds:
     )
 
 
+def get_known_job_urls(session: Session, user: UserModel) -> set[str]:
+    return set(
+        session.exec(
+            select(JobEntryModel.canonical_job_url).where(
+                JobEntryModel.user_id == user.id
+            )
+        ).all()
+    )
+
+
+def get_job_signatures(
+    session: Session, user: UserModel
+) -> Sequence[tuple[int, list[int]]]:
+    return session.exec(
+        select(JobEntryModel.id, JobEntryModel.minhash_signature).where(
+            JobEntryModel.user_id == user.id,
+            JobEntryModel.minhash_signature.is_not(None),
+        )
+    ).all()
+
+
 def save_job_entry(
     session: Session, user: UserModel, job_entry: JobEntry
 ) -> JobEntryModel:
-    job_entry_model = JobEntryModel.model_validate(job_entry.model_dump())
-    job_entry_model.user_id = user.id
+    canonical_job_url = canonicalize_url(job_entry.job_url)
+    job_entry_model = session.exec(
+        select(JobEntryModel).where(
+            JobEntryModel.user_id == user.id,
+            JobEntryModel.canonical_job_url == canonical_job_url,
+        )
+    ).first()
+    if job_entry_model:
+        # Offer seen before keeps its original discovery date
+        job_entry_model.sqlmodel_update(
+            job_entry.model_dump(exclude={"discovery_date"})
+        )
+    else:
+        job_entry_model = JobEntryModel.model_validate(job_entry.model_dump())
+        job_entry_model.user_id = user.id
+        job_entry_model.canonical_job_url = canonical_job_url
+    job_entry_model.minhash_signature = job_entry_signature(job_entry)
     session.add(job_entry_model)
     session.commit()
     session.refresh(job_entry_model)
     return job_entry_model
 
 
+def save_website_storage_state(
+    session: Session, website: WebsiteModel, storage_state: str
+) -> None:
+    website.cookies = storage_state
+    session.add(website)
+    session.commit()
+
+
+def save_website_automation_steps(
+    session: Session, website: WebsiteModel, automation_steps: AutomationSteps
+) -> None:
+    website.automation_steps = automation_steps.model_dump(mode="json")
+    session.add(website)
+    session.commit()
+
+
+def save_website_job_link_selectors(
+    session: Session, website: WebsiteModel, job_link_selectors: dict[str, str]
+) -> None:
+    # New dict, so that the JSON column is marked as modified
+    website.job_link_selectors = dict(job_link_selectors)
+    session.add(website)
+    session.commit()
+
+
+def get_crawl_checkpoint(
+    session: Session, website: WebsiteModel
+) -> CrawlCheckpointModel | None:
+    return session.exec(
+        select(CrawlCheckpointModel).where(
+            CrawlCheckpointModel.website_id == website.id
+        )
+    ).first()
+
+
+def save_crawl_checkpoint(
+    session: Session, checkpoint: CrawlCheckpointModel
+) -> None:
+    checkpoint.updated_at = datetime.datetime.now()
+    session.add(checkpoint)
+    session.commit()
+
+
+def delete_crawl_checkpoint(session: Session, website: WebsiteModel) -> None:
+    if checkpoint := get_crawl_checkpoint(session=session, website=website):
+        session.delete(checkpoint)
+        session.commit()
+
+
+def create_scrape_run(session: Session, user: UserModel) -> ScrapeRunModel:
+    run = ScrapeRunModel(user_id=user.id)
+    session.add(run)
+    session.commit()
+    session.refresh(run)
+    return run
+
+
+def get_scrape_run(
+    session: Session, user: UserModel, run_id: int
+) -> ScrapeRunModel | None:
+    return session.exec(
+        select(ScrapeRunModel).where(
+            ScrapeRunModel.id == run_id, ScrapeRunModel.user_id == user.id
+        )
+    ).first()
+
+
+def finish_scrape_run(
+    session: Session, run_id: int, status: ScrapeRunStatusEnum
+) -> None:
+    run = session.get(ScrapeRunModel, run_id)
+    run.status = status
+    run.finished_at = datetime.datetime.now()
+    session.add(run)
+    session.commit()
+
+
+def interrupt_running_scrape_runs(session: Session) -> None:
+    for run in session.exec(
+        select(ScrapeRunModel).where(
+            ScrapeRunModel.status == ScrapeRunStatusEnum.running
+        )
+    ).all():
+        run.status = ScrapeRunStatusEnum.interrupted
+        session.add(run)
+    session.commit()
+
+
+def save_scrape_run_event(
+    session: Session, run_id: int, message: str
+) -> ScrapeRunEventModel:
+    event = ScrapeRunEventModel(run_id=run_id, message=message)
+    session.add(event)
+    session.commit()
+    session.refresh(event)
+    return event
+
+
+def get_scrape_run_events(
+    session: Session, run_id: int, after_id: int = 0
+) -> Sequence[ScrapeRunEventModel]:
+    return session.exec(
+        select(ScrapeRunEventModel)
+        .where(
+            ScrapeRunEventModel.run_id == run_id,
+            ScrapeRunEventModel.id > after_id,
+        )
+        .order_by(ScrapeRunEventModel.id)
+    ).all()
+
+
+def delete_old_scrape_run_events(
+    session: Session, user_id: int, kept_runs: int
+) -> None:
+    """
+    Delete events of all runs of the user but the latest kept_runs ones,
+    runs themselves stay
+    """
+    old_runs = (
+        select(ScrapeRunModel.id)
+        .where(ScrapeRunModel.user_id == user_id)
+        .order_by(ScrapeRunModel.id.desc())
+        .offset(kept_runs)
+    )
+    session.exec(
+        delete(ScrapeRunEventModel).where(
+            ScrapeRunEventModel.run_id.in_(old_runs)
+        )
+    )
+    session.commit()
+
+
 def save_model(
     session: Session,
     user: UserModel,
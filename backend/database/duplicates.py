@@ -0,0 +1,131 @@
+import hashlib
+import random
+import re
+from collections import defaultdict
+from typing import Hashable, Sequence
+
+from backend.schemas.models import JobEntry
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Seeded, so that signatures stored in the database stay comparable between runs
+_random = random.Random(1729)
+_PERMUTATIONS = tuple(
+    (
+        _random.randint(1, _MERSENNE_PRIME - 1),
+        _random.randint(0, _MERSENNE_PRIME - 1),
+    )
+    for _ in range(NUM_PERMUTATIONS)
+)
+
+
+def _normalize(text: str | None) -> list[str]:
+    return re.sub(r"[^\w]+", " ", (text or "").lower()).split()
+
+
+def _shingles(words: list[str]) -> set[str]:
+    if len(words) <= SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {
+        " ".join(words[i : i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(
+    title: str, company_name: str, description: str
+) -> list[int]:
+    """
+    MinHash signature over normalized title, company name and description
+    shingles, similar offers have signatures that agree on most positions
+    """
+    shingles = _shingles(_normalize(description))
+    # Title and company are added as whole shingles, so that the same
+    # description under different title or company is not treated as duplicate
+    shingles.add(f"title:{' '.join(_normalize(title))}")
+    shingles.add(f"company:{' '.join(_normalize(company_name))}")
+    hashes = [
+        int.from_bytes(
+            hashlib.blake2b(shingle.encode(), digest_size=4).digest()
+        )
+        for shingle in shingles
+    ]
+    return [
+        min((a * h + b) % _MERSENNE_PRIME for h in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def job_entry_signature(job_entry: JobEntry) -> list[int]:
+    return minhash_signature(
+        title=job_entry.title,
+        company_name=job_entry.company_name,
+        # Offers read from structured data keep their whole description in
+        # additional_information, with the other fields left empty
+        description=" ".join(
+            (
+                job_entry.requirements,
+                job_entry.duties,
+                job_entry.about_project,
+                job_entry.additional_information or "",
+                job_entry.location,
+            )
+        ),
+    )
+
+
+def estimate_similarity(first: Sequence[int], second: Sequence[int]) -> float:
+    return sum(a == b for a, b in zip(first, second)) / NUM_PERMUTATIONS
+
+
+class DuplicateIndex:
+    """
+    Locality-sensitive hashing index over MinHash signatures. Signatures are
+    split into bands, entries sharing at least one band are candidates and
+    only those are compared, so lookups do not depend on the index size.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD) -> None:
+        self.threshold = threshold
+        self._buckets: defaultdict[tuple[int, tuple[int, ...]], list] = (
+            defaultdict(list)
+        )
+        self._signatures: dict[Hashable, Sequence[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    @staticmethod
+    def _bands(signature: Sequence[int]):
+        for band in range(BANDS):
+            yield band, tuple(signature[band * ROWS : (band + 1) * ROWS])
+
+    def add(self, key: Hashable, signature: Sequence[int]) -> None:
+        if len(signature) != NUM_PERMUTATIONS:
+            return
+        self._signatures[key] = signature
+        for band in self._bands(signature):
+            self._buckets[band].append(key)
+
+    def query(self, signature: Sequence[int]) -> Hashable | None:
+        """
+        Return key of the most similar stored entry above threshold, or None
+        """
+        best_key, best_similarity = None, self.threshold
+        checked = set()
+        for band in self._bands(signature):
+            for key in self._buckets.get(band, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                similarity = estimate_similarity(
+                    signature, self._signatures[key]
+                )
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+        return best_key
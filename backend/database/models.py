@@ -1,16 +1,22 @@
 import datetime
 
 from pydantic import EmailStr
-from sqlmodel import JSON, Column, Field, SQLModel
+from sqlmodel import JSON, Column, Field, SQLModel, UniqueConstraint
 
-from backend.schemas.models import AutomationSteps, CVCreationModeEnum
+from backend.schemas.models import (
+    AutomationSteps,
+    CVCreationModeEnum,
+    ScrapeRunStatusEnum,
+)
 
 
 # TODO: Add priority to each category of skills and qualifications, so that the system can decide what should go into cv
-# TODO: How to recognise duplicate job offers on a different sites and on the same site at different time
-# Maybe try using normalization of several job information e.g. title, company name and part of description and fuzzy matching
-# https://github.com/rapidfuzz/RapidFuzz
+# Duplicate job offers on different sites are recognised with MinHash
+# signatures of normalized title, company name and description, see
+# backend/database/duplicates.py
 class JobEntryModel(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("user_id", "canonical_job_url"),)
+
     id: int | None = Field(default=None, primary_key=True)
     user_id: int | None = Field(
         default=None, foreign_key="usermodel.id", ondelete="CASCADE"
@@ -21,6 +27,7 @@ class JobEntryModel(SQLModel, table=True):
     company_name: str
     discovery_date: datetime.date = Field(default_factory=datetime.date.today)
     job_url: str
+    canonical_job_url: str = ""  # Set by crud.save_job_entry
     requirements: str
     duties: str
     about_project: str
@@ -33,6 +40,9 @@ class JobEntryModel(SQLModel, table=True):
     company_url: (
         None | str
     )  # TODO: Here LLM will need to find information on the internet
+    minhash_signature: list[int] | None = Field(
+        sa_column=Column(JSON), default=None
+    )
 
 
 class UserModel(SQLModel, table=True):
@@ -54,6 +64,9 @@ class UserPreferencesModel(SQLModel, table=True):
     generate_cover_letter: bool
     cv_path: str
     retries: int = 3
+    # Dumps of CrawlBudget, limits for every website and for the whole run
+    website_budget: dict = Field(sa_column=Column(JSON), default_factory=dict)
+    run_budget: dict = Field(sa_column=Column(JSON), default_factory=dict)
 
 
 class WebsiteModel(SQLModel, table=True):
@@ -68,6 +81,64 @@ class WebsiteModel(SQLModel, table=True):
     automation_steps: AutomationSteps | None = Field(
         sa_column=Column(JSON), default_factory=dict
     )
+    # Resource types or domains that are never blocked, e.g. "font cdn.com"
+    request_allowlist: str = ""
+    # Selectors of job offer links that worked, keyed by url pattern of the
+    # listing page, learned while scraping and not editable by the user
+    job_link_selectors: dict[str, str] = Field(
+        sa_column=Column(JSON), default_factory=dict
+    )
+
+
+class CrawlCheckpointModel(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: int | None = Field(
+        default=None, foreign_key="usermodel.id", ondelete="CASCADE"
+    )
+    website_id: int | None = Field(
+        default=None,
+        foreign_key="websitemodel.id",
+        ondelete="CASCADE",
+        unique=True,
+    )
+    listing_url: str = ""
+    page_index: int = 0
+    # Canonical urls of offers that left the pipeline
+    processed_job_urls: list[str] = Field(
+        sa_column=Column(JSON), default_factory=list
+    )
+    # Offers found on listing pages, but not processed yet
+    pending_job_urls: list[str] = Field(
+        sa_column=Column(JSON), default_factory=list
+    )
+    # Accepted offers (JobEntry dumps) still waiting for CV and cover letter
+    pending_documents: list[dict] = Field(
+        sa_column=Column(JSON), default_factory=list
+    )
+    updated_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+
+class ScrapeRunModel(SQLModel, table=True):
+    id: int | None = Field(default=None, primary_key=True)
+    user_id: int | None = Field(
+        default=None, foreign_key="usermodel.id", ondelete="CASCADE"
+    )
+    status: ScrapeRunStatusEnum = ScrapeRunStatusEnum.running
+    started_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+    finished_at: datetime.datetime | None = None
+
+
+class ScrapeRunEventModel(SQLModel, table=True):
+    # Also used as id of the SSE event, so clients can resume after it
+    id: int | None = Field(default=None, primary_key=True)
+    run_id: int | None = Field(
+        default=None,
+        foreign_key="scraperunmodel.id",
+        ondelete="CASCADE",
+        index=True,
+    )
+    # Whole SSE message without its id field
+    message: str
 
 
 class LocationModel(SQLModel, table=True):
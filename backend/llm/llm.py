@@ -1,7 +1,8 @@
 # TODO: If not used, remove openai-agents from dependencies and add normal OpenAI
 # TODO: Use async OpenAI class
 import asyncio
-from typing import TypeVar
+from contextvars import ContextVar
+from typing import Callable, TypeVar
 
 import tiktoken
 from openai import AsyncOpenAI, AuthenticationError, RateLimitError
@@ -17,6 +18,16 @@ OPENAI_MODEL = "gpt-5-mini-2025-08-07"
 TIK = tiktoken.encoding_for_model("gpt-5-")
 T = TypeVar("T", bound=BaseModel)
 logger = get_logger()
+# Set by the scraping pipeline, so that tokens are counted against budget of
+# the website that is being scraped
+token_usage_callback: ContextVar[Callable[[int], None] | None] = ContextVar(
+    "token_usage_callback", default=None
+)
+
+
+def record_token_usage(tokens: int) -> None:
+    if callback := token_usage_callback.get():
+        callback(tokens)
 
 
 async def send_req_to_llm(
@@ -51,6 +62,8 @@ async def send_req_to_llm(
                         temperature=temperature,
                         text_format=model,
                     )
+                    if response and response.usage:
+                        record_token_usage(response.usage.total_tokens)
                     if response and response.output_parsed:
                         return response.output_parsed
                 else:
@@ -63,6 +76,8 @@ async def send_req_to_llm(
                         tools=tools,
                         temperature=temperature,
                     )
+                    if response and response.usage:
+                        record_token_usage(response.usage.total_tokens)
                     if response:
                         return response.output_text
             except RateLimitError as e:
@@ -97,6 +112,8 @@ async def send_req_to_llm(
                 # messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
             )
+            if response.usage:
+                record_token_usage(response.usage.total_tokens)
             return response.output_text
         except Exception as e:
             logger.info(f"LLM error: {e}")
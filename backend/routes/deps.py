@@ -1,11 +1,12 @@
 from typing import Annotated, Generator
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from pydantic import EmailStr
 from sqlmodel import Session, select
 
 from backend.database.db import engine
 from backend.database.models import UserModel
+from backend.scrapers.runs import ScrapeRunManager
 
 user: UserModel = UserModel()
 
@@ -29,5 +30,10 @@ def set_current_user(session: Session, email: EmailStr | str | None) -> None:
         user = UserModel()
 
 
+def get_run_manager(request: Request) -> ScrapeRunManager:
+    return request.app.state.run_manager
+
+
 SessionDep = Annotated[Session, Depends(get_session)]
 CurrentUser = Annotated[UserModel, Depends(current_user)]
+RunManagerDep = Annotated[ScrapeRunManager, Depends(get_run_manager)]
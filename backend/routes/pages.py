@@ -6,12 +6,15 @@ from fastapi import (
     APIRouter,
     File,
     Form,
+    Header,
+    HTTPException,
     Request,
     UploadFile,
     status,
 )
 from fastapi.responses import (
     HTMLResponse,
+    JSONResponse,
     RedirectResponse,
     StreamingResponse,
 )
@@ -21,9 +24,7 @@ from sqlmodel import func
 from backend.config import settings
 from backend.database.crud import (
     get_job_entries,
-    get_user_needs,
-    get_user_preferences,
-    get_websites,
+    get_scrape_run,
     update_user_preferences,
 )
 from backend.database.models import (
@@ -32,8 +33,8 @@ from backend.database.models import (
     UserPreferencesModel,
 )
 from backend.logger import get_logger
-from backend.routes.deps import CurrentUser, SessionDep
-from backend.scrapers import find_job_entries
+from backend.routes.deps import CurrentUser, RunManagerDep, SessionDep
+from backend.schemas.models import CrawlBudget
 
 router = APIRouter(tags=["pages"])
 templates = Jinja2Templates(settings.ROOT_DIR / "templates")
@@ -41,7 +42,12 @@ logger = get_logger()
 
 
 @router.get("/", response_class=Union[RedirectResponse, HTMLResponse])
-async def index(user: CurrentUser, session: SessionDep, request: Request):
+async def index(
+    user: CurrentUser,
+    session: SessionDep,
+    run_manager: RunManagerDep,
+    request: Request,
+):
     if not user.id:
         if session.scalar(func.count(UserModel.id)) >= 1:
             return RedirectResponse(
@@ -62,6 +68,7 @@ async def index(user: CurrentUser, session: SessionDep, request: Request):
             "user": user,
             "scraped_job_entries": scraped_job_entries,
             "key_exists": True if settings.OPENAI_API_KEY else False,
+            "active_run_id": run_manager.get_active_run_id(user),
         },
     )
 
@@ -93,37 +100,88 @@ async def save_preferences(
     retries: Annotated[int, Form()],
     cv_file: Annotated[UploadFile, File],
     generate_cover_letter: Annotated[bool, Form()] = False,
+    website_max_listing_pages: Annotated[int | None, Form()] = None,
+    website_max_job_details: Annotated[int | None, Form()] = None,
+    website_max_llm_tokens: Annotated[int | None, Form()] = None,
+    website_max_minutes: Annotated[float | None, Form()] = None,
+    run_max_listing_pages: Annotated[int | None, Form()] = None,
+    run_max_job_details: Annotated[int | None, Form()] = None,
+    run_max_llm_tokens: Annotated[int | None, Form()] = None,
+    run_max_minutes: Annotated[float | None, Form()] = None,
 ):
+    website_budget = CrawlBudget(
+        max_listing_pages=website_max_listing_pages,
+        max_job_details=website_max_job_details,
+        max_llm_tokens=website_max_llm_tokens,
+        max_minutes=website_max_minutes,
+    )
+    run_budget = CrawlBudget(
+        max_listing_pages=run_max_listing_pages,
+        max_job_details=run_max_job_details,
+        max_llm_tokens=run_max_llm_tokens,
+        max_minutes=run_max_minutes,
+    )
     preferences_model = UserPreferencesModel(
         cv_creation_mode=cv_creation_mode,
         generate_cover_letter=generate_cover_letter,
         cv_path=await save_user_cv(cv_file),
         retries=retries,
+        website_budget=website_budget.model_dump(),
+        run_budget=run_budget.model_dump(),
     )
     update_user_preferences(session=session, user=user, model=preferences_model)
 
 
-@router.get("/scrape_jobs", response_class=StreamingResponse)
-async def scrape_jobs(user: CurrentUser, session: SessionDep):
+@router.post("/scrape_jobs", response_class=JSONResponse)
+async def start_scraping(
+    user: CurrentUser, run_manager: RunManagerDep, resume: bool = True
+):
     # if not settings.OPENAI_API_KEY:
     #     raise HTTPException(
     #         status_code=404, detail="OPENAI_API_KEY env variable is not set"
     #     )
-    websites = get_websites(session=session, user=user, use_base_model=True)
-    user_preferences = get_user_preferences(session=session, user=user)
-    user_needs = get_user_needs(session=session, user=user)
+    run_id = await run_manager.start_run(user=user, resume=resume)
+    return {"run_id": run_id}
+
+
+@router.get("/scrape_jobs/{run_id}/events", response_class=StreamingResponse)
+async def scrape_job_events(
+    user: CurrentUser,
+    session: SessionDep,
+    run_manager: RunManagerDep,
+    run_id: int,
+    last_event_id: Annotated[int, Header()] = 0,
+):
+    if not get_scrape_run(session=session, user=user, run_id=run_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Scrape run {run_id} does not exist",
+        )
+    # EventSource sends Last-Event-ID on reconnect, so missed events are
+    # replayed instead of starting a new run
     return StreamingResponse(
-        content=find_job_entries(
-            user=user,
-            session=session,
-            websites=websites,
-            user_preferences=user_preferences,
-            user_needs=user_needs,
+        content=run_manager.subscribe(
+            run_id=run_id, last_event_id=last_event_id
         ),
         media_type="text/event-stream",
     )
 
 
+@router.post("/scrape_jobs/{run_id}/cancel")
+async def cancel_scraping(
+    user: CurrentUser,
+    session: SessionDep,
+    run_manager: RunManagerDep,
+    run_id: int,
+):
+    if not get_scrape_run(session=session, user=user, run_id=run_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Scrape run {run_id} does not exist",
+        )
+    run_manager.cancel_run(run_id)
+
+
 # TODO: In the future
 # @router.post("/download_cv", response_class=FileResponse)
 # async def download_cv(request: Request, path: str):
@@ -34,6 +34,7 @@ class WebsitePost(BaseModel):
     user_password: str
     url: str
     automation_steps: AutomationSteps | None
+    request_allowlist: str = ""
 
     model_config = ConfigDict(strict=True)
 
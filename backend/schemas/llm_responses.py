@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import StrEnum
 from typing import Literal, Optional
 
@@ -14,11 +14,13 @@ from backend.schemas.models import (
     Language,
     ProgrammingLanguage,
     Project,
+    Step,
     Tool,
 )
 
 
 class HTMLElement(BaseModel):
+    handle: str = ""
     id: str = ""
     name: str = ""
     element_type: str = ""
@@ -105,8 +107,22 @@ class ToolResult(BaseModel):
     additional_information: Optional[str] = None
 
 
+@dataclass
+class PageSnapshot:
+    url: str
+    # Texts of page elements, as they were shown to the LLM
+    texts: list[str]
+
+
 @dataclass
 class ContextForLLM:
     page: Page
     website_info: WebsiteModel
     agent_name: str
+    # Successful actions of the agent, saved for replay if its task is done
+    recorded_steps: list[Step] = field(default_factory=list)
+    # Last full page representation sent to the agent, later ones only
+    # hold changes made since then
+    snapshot: PageSnapshot | None = None
+    # Task of the agent, page elements are ranked by relevance to it
+    goal: str = ""
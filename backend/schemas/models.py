@@ -1,6 +1,6 @@
 import datetime
 from enum import StrEnum
-from typing import Callable, Sequence
+from typing import Sequence
 
 from pydantic import BaseModel, EmailStr
 
@@ -40,6 +40,15 @@ class CVCreationModeEnum(StrEnum):
     user_specified = "user-specified"
 
 
+class ScrapeRunStatusEnum(StrEnum):
+    running = "running"
+    finished = "finished"
+    failed = "failed"
+    cancelled = "cancelled"
+    # Application was stopped while the run was still going
+    interrupted = "interrupted"
+
+
 class AttributeType(StrEnum):
     id = "id"
     text = "text"
@@ -49,21 +58,33 @@ class AttributeType(StrEnum):
     class_l = "class_l"
 
 
+class StepActionEnum(StrEnum):
+    click = "click"
+    fill = "fill"
+
+
 class Step(BaseModel):
-    action: Callable
+    action: StepActionEnum
     html_element_attribute: str  # TODO: Experiment with Locators too if you can
-    attribute_type: AttributeType
-    arguments: dict
+    attribute_type: AttributeType = AttributeType.text
+    arguments: dict = {}
+    # Url of the page after the step, used to verify replayed steps
+    page_url: str = ""
 
 
 class AutomationSteps(BaseModel):
-    login_to_page: list[Step]
-    is_on_login_page: list[Step]
-    navigate_to_login_page: list[Step]
-    pass_cookies_popup: list[Step]
-    navigate_to_job_list: list[Step]
-    get_job_entries: list[Step]
-    navigate_to_next_page: list[Step]
+    """
+    Steps recorded from successful agent runs, None means that a task was
+    not recorded yet
+    """
+
+    login_to_page: list[Step] | None = None
+    is_on_login_page: list[Step] | None = None
+    navigate_to_login_page: list[Step] | None = None
+    pass_cookies_popup: list[Step] | None = None
+    navigate_to_job_list: list[Step] | None = None
+    get_job_entries: list[Step] | None = None
+    navigate_to_next_page: list[Step] | None = None
     # TODO: Uncomment if this function gets html elements get_job_information: list[Step]
 
 
@@ -73,6 +94,7 @@ class Website(BaseModel):
     user_password: str
     url: str
     automation_steps: AutomationSteps | None
+    request_allowlist: str = ""
 
 
 class Location(BaseModel):
@@ -138,11 +160,24 @@ class SocialPlatform(BaseModel):
     url: str
 
 
+class CrawlBudget(BaseModel):
+    """
+    Limits of a single scraping run, None means no limit
+    """
+
+    max_listing_pages: int | None = None
+    max_job_details: int | None = None
+    max_llm_tokens: int | None = None
+    max_minutes: float | None = None
+
+
 class UserPreferences(BaseModel):
     cv_creation_mode: CVCreationModeEnum = CVCreationModeEnum.llm_generation
     generate_cover_letter: bool = True
     cv_path: str = ""
     retries: int = 3
+    website_budget: CrawlBudget = CrawlBudget()
+    run_budget: CrawlBudget = CrawlBudget()
 
 
 class UserNeeds(BaseModel):
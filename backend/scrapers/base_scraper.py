@@ -3,12 +3,15 @@ import abc
 from devtools import pformat
 from playwright.async_api import BrowserContext, Page
 
+from backend.config import settings
 from backend.database.models import WebsiteModel
 from backend.llm.llm import send_req_to_llm
 from backend.llm.prompts import load_prompt
 from backend.logger import get_logger
 from backend.schemas.llm_responses import StateOutput
-from backend.schemas.models import JobEntry, UserNeeds
+from backend.schemas.models import AutomationSteps, JobEntry, UserNeeds
+from backend.scrapers.page_pool import PagePool
+from backend.scrapers.page_processing import JobLink
 
 logger = get_logger()
 
@@ -27,9 +30,19 @@ class BaseScraper(abc.ABC):
         self.page = page
         self.website_info = website_info
         self.retries = retries
+        self.page_pool = PagePool(context=context, size=settings.PAGE_POOL_SIZE)
+        self.automation_steps = AutomationSteps.model_validate(
+            website_info.automation_steps or {}
+        )
+        # Set when new steps were recorded and should be saved
+        self.automation_steps_changed = False
+        self.job_link_selectors: dict[str, str] = dict(
+            website_info.job_link_selectors or {}
+        )
+        self.job_link_selectors_changed = False
 
     @abc.abstractmethod
-    async def login_to_page(self) -> None:
+    async def login_to_page(self) -> bool:
         pass
 
     @abc.abstractmethod
@@ -37,30 +50,38 @@ class BaseScraper(abc.ABC):
         pass
 
     @abc.abstractmethod
-    async def get_job_entries(self) -> tuple[str, ...]:
+    async def get_job_entries(self) -> tuple[JobLink, ...]:
         pass
 
     @abc.abstractmethod
     async def navigate_to_next_page(self) -> bool:
         pass
 
+    async def close(self) -> None:
+        """
+        Release resources opened by the scraper besides its page
+        """
+
     @abc.abstractmethod
     async def _apply_for_job(self):
         pass
 
     @abc.abstractmethod
-    async def _get_job_information(self, url: str) -> JobEntry | None:
+    async def _get_job_information(
+        self, url: str, tile_text: str = ""
+    ) -> JobEntry | None:
         pass
 
-    async def process_and_evaluate_job(
-        self, job_url: str, user_needs: UserNeeds
+    async def get_job_information(
+        self, job_url: str, tile_text: str = ""
     ) -> JobEntry | None:
-        job_entry = await self._get_job_information(job_url)
+        job_entry = await self._get_job_information(job_url, tile_text)
         logger.info(f"job_entry: {pformat(job_entry)}")
-        if not job_entry:
-            return None
+        return job_entry
 
-        # return job_entry
+    async def evaluate_job(
+        self, job_entry: JobEntry, user_needs: UserNeeds
+    ) -> bool:
         state = await send_req_to_llm(
             prompt=await load_prompt(
                 prompt_path="scraping:user:determine_if_offer_valuable",
@@ -70,7 +91,4 @@ class BaseScraper(abc.ABC):
             use_openai=True,
             model=StateOutput,
         )
-
-        if state.state:
-            return job_entry
-        return None
+        return state.state
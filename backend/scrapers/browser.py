@@ -0,0 +1,86 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    Error,
+    Playwright,
+    async_playwright,
+)
+from playwright_stealth import Stealth
+
+from backend.logger import get_logger
+
+logger = get_logger()
+
+
+class BrowserManager:
+    """
+    Keeps warm, stealth-patched browser processes for the whole lifetime of
+    the application and hands out fresh contexts from them. Browsers that
+    crashed or got disconnected are relaunched the next time they are needed.
+    """
+
+    def __init__(self, size: int, headless: bool) -> None:
+        self.size = max(1, size)
+        self.headless = headless
+        self._playwright_manager = Stealth().use_async(async_playwright())
+        self._playwright: Playwright | None = None
+        self._browsers: list[Browser | None] = [None] * self.size
+        self._next = 0
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        self._playwright = await self._playwright_manager.__aenter__()
+        for index in range(self.size):
+            try:
+                self._browsers[index] = await self._launch()
+            except Error as e:
+                # Browser will be launched again when the first run needs it
+                logger.error(f"Could not launch browser: {e.message}")
+
+    async def stop(self) -> None:
+        async with self._lock:
+            for browser in self._browsers:
+                if browser and browser.is_connected():
+                    await browser.close()
+            self._browsers = [None] * self.size
+            if self._playwright:
+                await self._playwright_manager.__aexit__(None, None, None)
+                self._playwright = None
+
+    async def _launch(self) -> Browser:
+        if not self._playwright:
+            raise Exception("BrowserManager was not started")
+        # TODO: Add ability for users to choose their preferred browser, recommend and default to chromium
+        return await self._playwright.chromium.launch(headless=self.headless)
+
+    async def _get_browser(self) -> Browser:
+        async with self._lock:
+            index = self._next % self.size
+            self._next += 1
+            browser = self._browsers[index]
+            if not browser or not browser.is_connected():
+                if browser:
+                    logger.warning("Browser got disconnected, relaunching it")
+                browser = await self._launch()
+                self._browsers[index] = browser
+            return browser
+
+    @asynccontextmanager
+    async def new_context(self, **kwargs) -> AsyncIterator[BrowserContext]:
+        browser = await self._get_browser()
+        try:
+            context = await browser.new_context(**kwargs)
+        except Error:
+            # Browser might have crashed right after it was handed out
+            logger.warning("Could not create context, retrying")
+            browser = await self._get_browser()
+            context = await browser.new_context(**kwargs)
+        try:
+            yield context
+        finally:
+            if browser.is_connected():
+                await context.close()
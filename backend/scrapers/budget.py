@@ -0,0 +1,75 @@
+import time
+
+from backend.schemas.models import CrawlBudget
+
+
+class BudgetTracker:
+    """
+    Counts work done while scraping and tells which budget has run out.
+    Tracker of a single website also counts the work against the budget of
+    the whole run, given as its parent.
+    """
+
+    def __init__(
+        self,
+        budget: CrawlBudget,
+        scope: str,
+        parent: "BudgetTracker | None" = None,
+    ) -> None:
+        self.budget = budget
+        self.scope = scope
+        self.parent = parent
+        self.listing_pages = 0
+        self.job_details = 0
+        self.llm_tokens = 0
+        self._start = time.monotonic()
+
+    @property
+    def minutes(self) -> float:
+        return (time.monotonic() - self._start) / 60
+
+    def add_listing_page(self) -> None:
+        self.listing_pages += 1
+        if self.parent:
+            self.parent.add_listing_page()
+
+    def add_job_detail(self) -> None:
+        self.job_details += 1
+        if self.parent:
+            self.parent.add_job_detail()
+
+    def add_llm_tokens(self, tokens: int) -> None:
+        self.llm_tokens += tokens
+        if self.parent:
+            self.parent.add_llm_tokens(tokens)
+
+    def exhausted(self, count_limits: bool = True) -> str | None:
+        """
+        Return name of the budget that ran out, e.g. 'website:max_job_details',
+        or None if work can go on. Limits on listing pages and job details
+        only stop queueing of new work, so already queued work checks just
+        tokens and time with count_limits set to False.
+        """
+        if self.parent and (exhausted := self.parent.exhausted(count_limits)):
+            return exhausted
+        limits = [
+            ("max_llm_tokens", self.budget.max_llm_tokens, self.llm_tokens),
+            ("max_minutes", self.budget.max_minutes, self.minutes),
+        ]
+        if count_limits:
+            limits += [
+                (
+                    "max_listing_pages",
+                    self.budget.max_listing_pages,
+                    self.listing_pages,
+                ),
+                (
+                    "max_job_details",
+                    self.budget.max_job_details,
+                    self.job_details,
+                ),
+            ]
+        for name, limit, used in limits:
+            if limit is not None and used >= limit:
+                return f"{self.scope}:{name}"
+        return None
@@ -0,0 +1,114 @@
+import time
+
+from sqlmodel import Session
+
+from backend.database.crud import (
+    delete_crawl_checkpoint,
+    get_crawl_checkpoint,
+    save_crawl_checkpoint,
+)
+from backend.database.models import (
+    CrawlCheckpointModel,
+    UserModel,
+    WebsiteModel,
+)
+from backend.logger import get_logger
+from backend.schemas.models import JobEntry
+from backend.utils import canonicalize_url
+
+logger = get_logger()
+SAVE_INTERVAL = 1.0  # Seconds
+
+
+class CrawlCheckpoint:
+    """
+    Progress of scraping a single website, persisted in the database, so that
+    an interrupted run can continue from the last listing page instead of
+    starting from scratch
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        user: UserModel,
+        website: WebsiteModel,
+        resume: bool,
+    ) -> None:
+        self.session = session
+        self.website = website
+        model = get_crawl_checkpoint(session=session, website=website)
+        if model and not resume:
+            delete_crawl_checkpoint(session=session, website=website)
+            model = None
+        self.resumed = bool(model and model.listing_url)
+        if self.resumed:
+            logger.info(
+                f"Resuming '{website.url}' from page {model.page_index}: "
+                f"{model.listing_url}"
+            )
+        self.model = model or CrawlCheckpointModel(
+            user_id=user.id, website_id=website.id
+        )
+        self.processed_job_urls = set(self.model.processed_job_urls)
+        # Dicts keep discovery order of pending offers
+        self.pending_job_urls = dict.fromkeys(self.model.pending_job_urls)
+        self.pending_documents = {
+            document["job_url"]: document
+            for document in self.model.pending_documents
+        }
+        self._last_save = 0.0
+
+    @property
+    def listing_url(self) -> str:
+        return self.model.listing_url
+
+    @property
+    def page_index(self) -> int:
+        return self.model.page_index
+
+    def get_pending_documents(self) -> list[JobEntry]:
+        return [
+            JobEntry.model_validate(document)
+            for document in self.pending_documents.values()
+        ]
+
+    def is_processed(self, job_url: str) -> bool:
+        return canonicalize_url(job_url) in self.processed_job_urls
+
+    def listing_page_reached(self, listing_url: str, page_index: int) -> None:
+        self.model.listing_url = listing_url
+        self.model.page_index = page_index
+        self.save(force=True)
+
+    def job_discovered(self, job_url: str) -> None:
+        self.pending_job_urls[job_url] = None
+        self.save()
+
+    def document_pending(self, job_entry: JobEntry) -> None:
+        self.pending_job_urls.pop(job_entry.job_url, None)
+        self.pending_documents[job_entry.job_url] = job_entry.model_dump(
+            mode="json"
+        )
+        self.save()
+
+    def job_processed(self, job_url: str) -> None:
+        self.pending_job_urls.pop(job_url, None)
+        self.pending_documents.pop(job_url, None)
+        self.processed_job_urls.add(canonicalize_url(job_url))
+        self.save()
+
+    def save(self, force: bool = False) -> None:
+        # Offers are processed quickly one after another, so database writes
+        # are throttled, at most a second of progress can be lost
+        now = time.monotonic()
+        if not force and now - self._last_save < SAVE_INTERVAL:
+            return
+        self._last_save = now
+        # JSON columns are only written when new objects are assigned
+        self.model.processed_job_urls = list(self.processed_job_urls)
+        self.model.pending_job_urls = list(self.pending_job_urls)
+        self.model.pending_documents = list(self.pending_documents.values())
+        save_crawl_checkpoint(session=self.session, checkpoint=self.model)
+
+    def finish(self) -> None:
+        delete_crawl_checkpoint(session=self.session, website=self.website)
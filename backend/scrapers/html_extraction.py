@@ -0,0 +1,388 @@
+import sys
+from typing import Any, Callable, Literal
+
+from bs4 import BeautifulSoup
+from lxml import etree
+from playwright.async_api import Page
+
+from backend.config import settings
+from backend.schemas.llm_responses import HTMLElement
+
+TAGS_TO_REMOVE = (
+    "head",
+    "meta",
+    "style",
+    "script",
+    "noscript",
+    "template",
+    "iframe",
+    "video",
+    "audio",
+    "map",
+    "area",
+    "embed",
+    "object",
+    "applet",
+    "track",
+    "canvas",
+    "svg",
+    "img",
+    "picture",
+    "source",
+)
+# BeautifulSoup keeps whitespace only strings as they are inside these tags
+# and shortens them to a single character everywhere else
+PRESERVE_WHITESPACE_TAGS = frozenset(("pre", "textarea"))
+_TAGS_TO_REMOVE = frozenset(TAGS_TO_REMOVE)
+# Added to elements in the browser before a snapshot is taken, so that the
+# element picked by the LLM can be found with a single lookup
+HANDLE_ATTRIBUTE = "data-autojobapp-handle"
+
+HTMLParserName = Literal["lxml", "html.parser"]
+NO_PARENT = -1
+
+
+class ElementRecord:
+    """
+    Attributes of a single element, parents are kept in the node table of
+    ElementTable as index of the element's parent
+    """
+
+    __slots__ = (
+        "parent",
+        "handle",
+        "id",
+        "name",
+        "element_type",
+        "aria_label",
+        "role",
+        "text",
+        "classes",
+        "tag",
+        "in_viewport",
+    )
+
+    def __init__(
+        self,
+        parent: int,
+        handle: str,
+        id: str,
+        name: str,
+        element_type: str,
+        aria_label: str,
+        role: str,
+        text: str,
+        classes: list[str] | None,
+        tag: str = "",
+        in_viewport: bool | None = None,
+    ) -> None:
+        self.parent = parent
+        self.handle = handle
+        self.id = id
+        self.name = name
+        self.element_type = element_type
+        self.aria_label = aria_label
+        self.role = role
+        self.text = text
+        self.classes = classes
+        self.tag = tag
+        # Known only when elements are read in the browser
+        self.in_viewport = in_viewport
+
+
+class ElementTable:
+    """
+    Elements of a page snapshot. Tag names are interned and stored once per
+    node, together with index of the parent node, so parents of an element
+    are built only when an HTMLElement is materialized for it.
+    """
+
+    __slots__ = ("node_names", "node_parents", "records")
+
+    def __init__(self) -> None:
+        self.node_names: list[str] = []
+        self.node_parents: list[int] = []
+        self.records: list[ElementRecord] = []
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def add_node(self, name: str, parent: int) -> int:
+        self.node_names.append(sys.intern(name))
+        self.node_parents.append(parent)
+        return len(self.node_names) - 1
+
+    def add_record(
+        self,
+        get: Callable[[str], Any],
+        class_list: list[str] | None,
+        text: str,
+        parent: int,
+        tag: str = "",
+        in_viewport: bool | None = None,
+    ) -> None:
+        record = ElementRecord(
+            parent=parent,
+            handle=get(HANDLE_ATTRIBUTE) or "",
+            id=get("id") or "",
+            name=get("name") or "",
+            element_type=get("type") or "",
+            aria_label=get("aria-label") or "",
+            role=get("role") or "",
+            text=text or "",
+            classes=class_list,
+            tag=tag,
+            in_viewport=in_viewport,
+        )
+        # If there is only class_list don't append element to the tag_list
+        if (
+            record.id
+            or record.name
+            or record.element_type
+            or record.aria_label
+            or record.role
+            or record.text
+        ):
+            self.records.append(record)
+
+    def parents_list(self, index: int) -> list[str]:
+        parents = []
+        node = self.records[index].parent
+        while node != NO_PARENT:
+            parents.append(self.node_names[node])
+            node = self.node_parents[node]
+        parents.reverse()
+        return parents
+
+    def html_element(self, index: int) -> HTMLElement:
+        record = self.records[index]
+        # FIXME: playwright._impl._errors.Error: Locator.count: SyntaxError: Failed to execute 'querySelectorAll' on 'Document': '.tw-w-[120px]' is not a valid selector.
+        class_list = [
+            c.strip().replace("[", r"\[").replace("]", r"\]")
+            for c in record.classes or []
+            if c.strip()
+        ]
+        parents_list = self.parents_list(index)
+        return HTMLElement(
+            handle=record.handle,
+            id=record.id,
+            name=record.name,
+            element_type=record.element_type,
+            aria_label=record.aria_label,
+            role=record.role,
+            text=record.text,
+            class_list=class_list,
+            parents=" ".join(parents_list),
+            parents_list=parents_list,
+        )
+
+    def html_elements(self) -> list[HTMLElement]:
+        return [self.html_element(index) for index in range(len(self))]
+
+
+def extract_elements_html_parser(page_content: str) -> ElementTable:
+    soup = BeautifulSoup(page_content, "html.parser")
+    for tag in soup(TAGS_TO_REMOVE):
+        tag.decompose()
+
+    table = ElementTable()
+    nodes: dict[int, int] = {}
+    # Get "the most important" elements' attributes
+    for tag in soup.find_all():
+        text = tag.find(string=True, recursive=False)
+        if not text:
+            text = ""
+        elif len(text) == 1:
+            text = ""
+        # Tags come in document order, so parents already have their nodes
+        parent = nodes.get(id(tag.parent), NO_PARENT)
+        nodes[id(tag)] = table.add_node(tag.name, parent)
+        table.add_record(
+            get=tag.get,
+            class_list=tag.get("class"),
+            text=str(text),
+            parent=parent,
+            tag=tag.name,
+        )
+    return table
+
+
+def _first_string(element: etree._Element, preserve_whitespace: bool) -> str:
+    """
+    First text directly inside the element, as BeautifulSoup's
+    tag.find(string=True, recursive=False) would return it
+    """
+    strings = [element.text]
+    for child in element:
+        # Comments are strings for BeautifulSoup, other tags are skipped
+        if child.tag is etree.Comment:
+            strings.append(child.text)
+        strings.append(child.tail)
+    for string in strings:
+        if not string:
+            continue
+        if not preserve_whitespace and not string.strip():
+            return ""
+        return string if len(string) > 1 else ""
+    return ""
+
+
+def extract_elements_lxml(page_content: str) -> ElementTable:
+    """
+    Same output as extract_elements_html_parser, but with lxml parsing and
+    a single walk over the tree
+    """
+    table = ElementTable()
+    if not page_content.strip():
+        return table
+    # lxml refuses str with an encoding declaration, like <?xml ... ?>, so
+    # the page is parsed as bytes, ignoring charsets declared in the page
+    root = etree.fromstring(
+        page_content.encode(), etree.HTMLParser(encoding="utf-8")
+    )
+    if root is None:
+        return table
+
+    # Stack of (element, its parent's node, inside <pre> or <textarea>),
+    # children are pushed in reverse, so elements come in document order
+    stack: list[tuple[etree._Element, int, bool]] = [(root, NO_PARENT, False)]
+    while stack:
+        element, parent, preserve = stack.pop()
+        name = element.tag
+        # Comments and processing instructions are not tags
+        if not isinstance(name, str) or name in _TAGS_TO_REMOVE:
+            continue
+        preserve = preserve or name in PRESERVE_WHITESPACE_TAGS
+        classes = element.get("class")
+        table.add_record(
+            get=element.get,
+            class_list=classes.split() if classes is not None else None,
+            text=_first_string(element, preserve),
+            parent=parent,
+            tag=name,
+        )
+        node = table.add_node(name, parent)
+        stack.extend((child, node, preserve) for child in reversed(element))
+    return table
+
+
+EXTRACTORS: dict[HTMLParserName, Callable[[str], ElementTable]] = {
+    "lxml": extract_elements_lxml,
+    "html.parser": extract_elements_html_parser,
+}
+
+
+def extract_elements(
+    page_content: str, parser: HTMLParserName | None = None
+) -> ElementTable:
+    """
+    Attributes and parents of page elements that have text or attributes
+    useful for finding them, in document order
+    """
+    return EXTRACTORS[parser or settings.HTML_PARSER](page_content)
+
+
+# Walks the live DOM once and returns only elements that would be kept by
+# the extractors above, hidden elements are left out. Records are
+# [text, id, name, type, aria-label, role, class, parent, handle, tag,
+# in viewport], where parent is index into the returned nodes, which are
+# [name, parent] pairs shared by all elements with the same parents.
+_EXTRACT_ELEMENTS_SCRIPT = """
+([tagsToRemove, preserveWhitespaceTags, handleAttribute]) => {
+    const removed = new Set(tagsToRemove);
+    const preserved = new Set(preserveWhitespaceTags);
+    const firstString = (element, preserve) => {
+        for (const node of element.childNodes) {
+            if (node.nodeType !== Node.TEXT_NODE
+                && node.nodeType !== Node.COMMENT_NODE) {
+                continue;
+            }
+            const text = node.data;
+            if (!text) continue;
+            if (!preserve && !text.trim()) return "";
+            return text.length > 1 ? text : "";
+        }
+        return "";
+    };
+    const inViewport = (element) => {
+        const rect = element.getBoundingClientRect();
+        return rect.bottom > 0 && rect.right > 0
+            && rect.top < window.innerHeight && rect.left < window.innerWidth;
+    };
+    const nodes = [];
+    const nodeIndexes = new Map();
+    const getNode = (name, parent) => {
+        const key = `${parent} ${name}`;
+        let index = nodeIndexes.get(key);
+        if (index === undefined) {
+            index = nodes.push([name, parent]) - 1;
+            nodeIndexes.set(key, index);
+        }
+        return index;
+    };
+    const records = [];
+    const stack = [[document.documentElement, -1, false]];
+    while (stack.length) {
+        const [element, parent, inPreserved] = stack.pop();
+        const name = element.localName;
+        if (removed.has(name)) continue;
+        const style = getComputedStyle(element);
+        if (style.display === "none") continue;
+        const preserve = inPreserved || preserved.has(name);
+        const visible = !element.checkVisibility || element.checkVisibility({
+            checkOpacity: true,
+            checkVisibilityCSS: true,
+        });
+        const text = visible ? firstString(element, preserve) : "";
+        const attributes = ["id", "name", "type", "aria-label", "role"].map(
+            (attribute) => visible ? element.getAttribute(attribute) || "" : ""
+        );
+        if (text || attributes.some(Boolean)) {
+            records.push([
+                text,
+                ...attributes,
+                element.getAttribute("class"),
+                parent,
+                element.getAttribute(handleAttribute) || "",
+                name,
+                inViewport(element),
+            ]);
+        }
+        if (!element.children.length) continue;
+        const node = getNode(name, parent);
+        for (let i = element.children.length - 1; i >= 0; i--) {
+            stack.push([element.children[i], node, preserve]);
+        }
+    }
+    return {nodes, records};
+}
+"""
+
+
+async def extract_elements_from_page(page: Page) -> ElementTable:
+    """
+    Elements of the page read by a script running in the browser, which
+    sends only the elements, instead of the whole HTML, and skips hidden ones
+    """
+    result = await page.evaluate(
+        _EXTRACT_ELEMENTS_SCRIPT,
+        [TAGS_TO_REMOVE, list(PRESERVE_WHITESPACE_TAGS), HANDLE_ATTRIBUTE],
+    )
+    table = ElementTable()
+    for name, parent in result["nodes"]:
+        table.add_node(name, parent)
+    for record in result["records"]:
+        text, *values, classes, parent, handle, tag, in_viewport = record
+        attributes = dict(
+            zip(("id", "name", "type", "aria-label", "role"), values)
+        )
+        attributes[HANDLE_ATTRIBUTE] = handle
+        table.add_record(
+            get=attributes.get,
+            class_list=classes.split() if classes is not None else None,
+            text=text,
+            parent=parent,
+            tag=tag,
+            in_viewport=in_viewport,
+        )
+    return table
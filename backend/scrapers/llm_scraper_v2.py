@@ -1,7 +1,9 @@
 import asyncio
 import datetime
+import json
 from collections import deque
-from typing import Deque
+from typing import Awaitable, Callable, Deque
+from urllib.parse import urlsplit
 
 import tiktoken
 from agents import (
@@ -17,10 +19,10 @@ from agents import (
 from agents.run import DEFAULT_MAX_TURNS
 from devtools import pformat
 from openai import AsyncOpenAI
-from playwright.async_api import Page
+from playwright.async_api import Error
 
 from backend.config import settings
-from backend.llm.llm import send_req_to_llm
+from backend.llm.llm import record_token_usage, send_req_to_llm
 from backend.llm.prompts import load_prompt
 from backend.logger import get_logger
 from backend.schemas.llm_responses import (
@@ -29,19 +31,41 @@ from backend.schemas.llm_responses import (
     TaskState,
     TextResponse,
 )
-from backend.schemas.models import JobEntry
+from backend.schemas.models import JobEntry, Step
 from backend.scrapers.base_scraper import BaseScraper
-from backend.scrapers.page_actions import goto
+from backend.scrapers.login_sessions import is_session_active
+from backend.scrapers.page_actions import goto, replay_step
+from backend.scrapers.pagination import (
+    PagePrefetcher,
+    build_page_url,
+    find_next_page_url,
+    get_page_number,
+)
 from backend.scrapers.page_processing import (
+    JobLink,
+    get_job_links,
     get_jobs_urls,
     get_page_content,
 )
-from backend.scrapers.tools import click_element, fill_element, get_page_data
+from backend.scrapers.structured_data import (
+    get_job_posting,
+    get_missing_fields,
+)
+from backend.scrapers.tools import (
+    FULL_SNAPSHOT_HEADER,
+    click_element,
+    fill_element,
+    find_elements,
+    get_page_data,
+)
+from backend.utils import canonicalize_url, url_pattern
 
 TOOL_CALL_TYPE = "function_call"
 TOOL_RESPONSE_TYPE = "function_call_output"
 OPENAI_MODEL = "gpt-5-mini-2025-08-07"
 TIK = tiktoken.encoding_for_model("gpt-5-")
+# More links than that means a selector matches much more than job offers
+MAX_JOB_LINKS_PER_PAGE = 200
 logger = get_logger()
 
 
@@ -78,6 +102,18 @@ def _is_tool_call_or_result(item: TResponseInputItem) -> bool:
     return t == TOOL_CALL_TYPE or t == TOOL_RESPONSE_TYPE
 
 
+def _get_item_field(item: TResponseInputItem, name: str) -> str:
+    if isinstance(item, dict):
+        return str(item.get(name, ""))
+    return str(getattr(item, name, ""))
+
+
+def _is_full_snapshot(item: TResponseInputItem) -> bool:
+    if _get_item_field(item, "type") != TOOL_RESPONSE_TYPE:
+        return False
+    return FULL_SNAPSHOT_HEADER in _get_item_field(item, "output")
+
+
 class TrimmingSession(SessionABC):
     def __init__(self, turns: int):
         self.turns = max(1, turns)
@@ -100,7 +136,22 @@ class TrimmingSession(SessionABC):
                     start_idx = i
                     break
 
-        return items[start_idx:]
+        trimmed = items[start_idx:]
+        if any(_is_full_snapshot(item) for item in trimmed):
+            return trimmed
+        # Latest full page representation is kept, with the call that asked
+        # for it, as page data results after it only hold changes
+        for i in range(start_idx - 1, -1, -1):
+            if _is_full_snapshot(items[i]):
+                call_id = _get_item_field(items[i], "call_id")
+                for call in items[:i]:
+                    if (
+                        _get_item_field(call, "type") == TOOL_CALL_TYPE
+                        and _get_item_field(call, "call_id") == call_id
+                    ):
+                        return [call, items[i], *trimmed]
+                break
+        return trimmed
 
     async def get_items(
         self, limit: int | None = None
@@ -138,7 +189,51 @@ class LLMScraperV2(BaseScraper):
     )
     # run_config = RunConfig(session_input_callback=)
 
-    async def _agent_loop(self, agent: Agent) -> bool:
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._visited_listing_pages: set[str] = set()
+        self._prefetcher = PagePrefetcher(
+            context=self.context, size=settings.PAGINATION_PREFETCH_PAGES
+        )
+
+    async def close(self) -> None:
+        await self._prefetcher.close()
+
+    def _record_steps(self, task: str, steps: list[Step]) -> None:
+        logger.info(f"Recorded {len(steps)} steps of '{task}'")
+        setattr(self.automation_steps, task, steps)
+        self.automation_steps_changed = True
+
+    async def _replay_steps(
+        self, task: str, verify: Callable[[], Awaitable[bool]]
+    ) -> bool:
+        """
+        Replay steps recorded for the task without any LLM calls, returns
+        False if there are none or the result does not pass verification
+        """
+        steps = getattr(self.automation_steps, task)
+        if steps is None:
+            return False
+
+        start_url = self.page.url
+        logger.info(f"Replaying {len(steps)} recorded steps of '{task}'")
+        for step in steps:
+            result = await replay_step(
+                page=self.page, step=step, website_info=self.website_info
+            )
+            # Elements like cookie popups are not always there, so only
+            # the end result decides whether the replay worked
+            if not result.success:
+                logger.info(f"Could not replay step: {pformat(step)}")
+
+        if await verify():
+            return True
+        logger.info(f"Replay of '{task}' failed verification, using agent")
+        if self.page.url != start_url:
+            await goto(page=self.page, link=start_url)
+        return False
+
+    async def _agent_loop(self, agent: Agent, task: str | None = None) -> bool:
         logger.debug(f"Running agent loop for '{agent.name}'")
 
         start_url = self.page.url
@@ -146,64 +241,121 @@ class LLMScraperV2(BaseScraper):
             DEFAULT_MAX_TURNS + 5
         )  # TODO: Test what happens if we have too little turns for a given agent
         for _ in range(self.retries):
+            context = ContextForLLM(
+                page=self.page,
+                website_info=self.website_info,
+                agent_name=agent.name,
+                goal=(
+                    agent.instructions
+                    if isinstance(agent.instructions, str)
+                    else ""
+                ),
+            )
             try:
                 result = await Runner.run(
                     starting_agent=agent,
                     input="",
                     session=TrimmingSession(turns=2),
-                    context=ContextForLLM(
-                        page=self.page,
-                        website_info=self.website_info,
-                        agent_name=agent.name,
-                    ),
+                    context=context,
                     max_turns=max_turns,
                     # run_config=self.run_config,
                 )
                 _log_agent_run_data(result)
+                record_token_usage(result.context_wrapper.usage.total_tokens)
             except MaxTurnsExceeded as e:
                 logger.error(
                     f"Agent '{agent.name}' could not finish task, {max_turns=}"
                 )
                 _log_agent_run_data(e.run_data)
+                if e.run_data:
+                    record_token_usage(
+                        e.run_data.context_wrapper.usage.total_tokens
+                    )
                 max_turns += 5
                 logger.info(f"Agent '{agent.name}' is making a retry with more turns ({max_turns})")
                 await goto(page=self.page, link=start_url)
                 continue
 
             if result.final_output.state == "done":
+                if task:
+                    self._record_steps(task, context.recorded_steps)
                 return True
             elif result.final_output.state == "failed":
                 return False
         return False
 
-    async def login_to_page(self) -> None:
+    async def login_to_page(self) -> bool:
         await goto(self.page, self.url)
 
+        if self.website_info.cookies and await is_session_active(self.page):
+            logger.info(f"Restored session for '{self.url}' is still active")
+            return True
+
+        if await self._replay_steps(
+            task="login_to_page", verify=lambda: is_session_active(self.page)
+        ):
+            return True
+
         login_agent = Agent(
             name="login_agent",
             instructions=await load_prompt("scraping:system:login_to_page"),
-            tools=[click_element, fill_element, get_page_data],
+            tools=[click_element, fill_element, find_elements, get_page_data],
             model=self._model,
             output_type=TaskState,
         )
 
-        await self._agent_loop(login_agent)
+        return await self._agent_loop(login_agent, task="login_to_page")
+
+    async def _is_on_recorded_job_list(self) -> bool:
+        steps = self.automation_steps.navigate_to_job_list
+        return (
+            not steps
+            or urlsplit(self.page.url).path == urlsplit(steps[-1].page_url).path
+        )
 
     async def navigate_to_job_listing_page(self) -> None:
+        if await self._replay_steps(
+            task="navigate_to_job_list", verify=self._is_on_recorded_job_list
+        ):
+            return
+
         job_list_page_agent = Agent(
             name="job_list_page_agent",
             instructions=await load_prompt(
                 "scraping:system:navigate_to_job_listing_page"
             ),
-            tools=[click_element, get_page_data],
+            tools=[click_element, find_elements, get_page_data],
             model=self._model,
             output_type=TaskState,
         )
 
-        await self._agent_loop(job_list_page_agent)
+        await self._agent_loop(job_list_page_agent, task="navigate_to_job_list")
+
+    def _remember_job_link_selector(self, selector: str) -> None:
+        pattern = url_pattern(self.page.url)
+        if self.job_link_selectors.get(pattern) != selector:
+            self.job_link_selectors[pattern] = selector
+            self.job_link_selectors_changed = True
+
+    async def _get_job_entries_from_cache(self) -> tuple[JobLink, ...]:
+        # Selectors learned on other kinds of pages of the website can match
+        # unrelated links, e.g. recommended offers, so only the selector of
+        # this kind of page is used
+        selector = self.job_link_selectors.get(url_pattern(self.page.url))
+        if not selector:
+            return tuple()
+        job_links = await get_job_links(self.page, selector)
+        if 0 < len(job_links) <= MAX_JOB_LINKS_PER_PAGE:
+            logger.info(f"Job urls got using cached selector: {selector}")
+            return job_links
+        logger.info(
+            f"Cached selector '{selector}' found {len(job_links)} links"
+        )
+        return tuple()
 
-    async def get_job_entries(self) -> tuple[str, ...]:
-        job_urls = tuple()
+    async def get_job_entries(self) -> tuple[JobLink, ...]:
+        if job_links := await self._get_job_entries_from_cache():
+            return job_links
 
         for _ in range(self.retries):
             text_response = await send_req_to_llm(
@@ -212,53 +364,128 @@ class LLMScraperV2(BaseScraper):
                 model=TextResponse,
             )
             try:
-                job_urls = await get_jobs_urls(text_response=text_response, page=self.page)
+                job_links, selector = await get_jobs_urls(
+                    text_response=text_response, page=self.page
+                )
             except Exception:
                 pass
 
-            if job_urls:
+            if job_links:
+                self._remember_job_link_selector(selector)
                 break
             else:
                 await asyncio.sleep(5)
 
-        if not job_urls:
+        if not job_links:
             logger.info("Could not find job tiles")
 
-        return job_urls
+        return job_links
+
+    async def _open_listing_page(self, url: str) -> None:
+        if page := await self._prefetcher.take(url):
+            await self.page.close()
+            self.page = page
+        else:
+            await goto(self.page, url)
+
+        # Without a page number there is nothing to prefetch, pages
+        # prefetched earlier are dropped either way
+        upcoming = []
+        if (number := get_page_number(url)) is not None:
+            upcoming = [
+                page_url
+                for i in range(1, self._prefetcher.size + 1)
+                if (page_url := build_page_url(url, number + i))
+            ]
+        await self._prefetcher.prefetch(upcoming)
 
     async def navigate_to_next_page(self) -> bool:
+        self._visited_listing_pages.add(canonicalize_url(self.page.url))
+        if next_url := await find_next_page_url(
+            page=self.page, visited=self._visited_listing_pages
+        ):
+            logger.info(f"Found next listing page without LLM: {next_url}")
+            await self._open_listing_page(next_url)
+            return True
+
+        # Pagination done with JavaScript only, e.g. "load more" buttons
+        async def body_text() -> str:
+            try:
+                return await self.page.inner_text("body")
+            except Error as e:
+                logger.error("Could not read text of the listing page")
+                logger.exception(e)
+                return ""
+
+        previous_url = self.page.url
+        previous_text = await body_text()
+
+        async def page_changed() -> bool:
+            return (
+                self.page.url != previous_url
+                or await body_text() != previous_text
+            )
+
+        if await self._replay_steps(
+            task="navigate_to_next_page", verify=page_changed
+        ):
+            return True
+
         next_page_agent = Agent(
             name="next_page_agent",
             instructions=await load_prompt("scraping:system:next_page_button"),
-            tools=[click_element, get_page_data],
+            tools=[click_element, find_elements, get_page_data],
             model=self._model,
             output_type=TaskState,
         )
 
-        return await self._agent_loop(next_page_agent)
+        return await self._agent_loop(
+            next_page_agent, task="navigate_to_next_page"
+        )
 
     async def _apply_for_job(self):
         pass
 
-    async def _get_job_information(self, url: str) -> JobEntry | None:
-        job_page: Page = await self.context.new_page()
-        await goto(job_page, url)
-
-        response = await send_req_to_llm(
-            prompt=await load_prompt(
-                prompt_path="scraping:user:job_offer_info",
-                page=await get_page_content(job_page),
-            ),
-            use_openai=True,
-            model=JobEntryResponse,
-        )
+    async def _get_job_information(
+        self, url: str, tile_text: str = ""
+    ) -> JobEntry | None:
+        # Page goes back to the pool before the LLM call, so other job offers
+        # can be loaded in the meantime
+        async with self.page_pool.page() as job_page:
+            await goto(job_page, url)
+            fields = await get_job_posting(job_page)
+            missing_fields = get_missing_fields(fields)
+            if missing_fields:
+                page_content = await get_page_content(job_page)
+
+        if not missing_fields:
+            logger.info(f"Job offer read from structured data: {url}")
+            attributes = dict.fromkeys(JobEntryResponse.model_fields, "")
+            attributes.update(fields)
+        else:
+            if fields:
+                prompt = await load_prompt(
+                    prompt_path="scraping:user:job_offer_missing_info",
+                    known_fields=json.dumps(fields, ensure_ascii=False),
+                    missing_fields=", ".join(missing_fields),
+                    page=page_content,
+                    tile_text=tile_text,
+                )
+            else:
+                prompt = await load_prompt(
+                    prompt_path="scraping:user:job_offer_info",
+                    page=page_content,
+                    tile_text=tile_text,
+                )
+            response = await send_req_to_llm(
+                prompt=prompt, use_openai=True, model=JobEntryResponse
+            )
+            # Structured data is exact, so it wins over the LLM
+            attributes = response.model_dump() | fields
 
-        attributes = response.model_dump()
         attributes["discovery_date"] = datetime.date.today()
         attributes["job_url"] = url
 
-        await job_page.close()
-
         try:
             job_entry = JobEntry.model_validate(attributes)
             logger.info(f"JobEntry model data: {pformat(job_entry)}")
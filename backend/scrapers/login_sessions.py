@@ -0,0 +1,84 @@
+import json
+import time
+
+from playwright.async_api import Error, Page
+
+from backend.logger import get_logger
+
+logger = get_logger()
+
+# Counts elements hinting whether user is logged in or not, done in a single
+# round trip to the browser. Logout links are often hidden in a collapsed
+# account menu, so they are counted regardless of their visibility. Login
+# links and password fields only count when visible, as hidden login forms
+# are often kept in the page of logged in users.
+_LOGIN_STATE_SCRIPT = """
+() => {
+    const visible = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0
+            && style.visibility !== "hidden" && style.display !== "none";
+    };
+    const loggedIn = /\\b(log ?out|sign ?out|wyloguj|my account|moje konto|my profile|m[oó]j profil)\\b/i;
+    const loggedOut = /\\b(log ?in|sign ?in|zaloguj)\\b/i;
+    const state = {passwordFields: 0, loggedIn: 0, loggedOut: 0};
+    for (const el of document.querySelectorAll('input[type="password"]')) {
+        if (visible(el)) state.passwordFields++;
+    }
+    for (const el of document.querySelectorAll('a, button, [role="button"], [role="link"], [role="menuitem"]')) {
+        const text = `${el.textContent || ""} ${el.getAttribute("aria-label") || ""}`
+            .replace(/\\s+/g, " ").trim();
+        if (text.length > 60) continue;
+        if (loggedIn.test(text)) state.loggedIn++;
+        else if (loggedOut.test(text) && visible(el)) state.loggedOut++;
+    }
+    return state;
+}
+"""
+
+
+def load_storage_state(raw: str) -> dict | None:
+    """
+    Parse Playwright storage state saved in WebsiteModel.cookies, returns None
+    if nothing was saved, state is malformed or all its cookies have expired
+    """
+    if not raw:
+        return None
+    try:
+        state = json.loads(raw)
+    except json.JSONDecodeError:
+        logger.warning("Saved cookies are not a valid storage state")
+        return None
+    if not isinstance(state, dict) or "cookies" not in state:
+        return None
+
+    now = time.time()
+    # Session cookies have expires set to -1
+    state["cookies"] = [
+        cookie
+        for cookie in state["cookies"]
+        if cookie.get("expires", -1) < 0 or cookie["expires"] > now
+    ]
+    if not state["cookies"]:
+        logger.info("All saved cookies have expired")
+        return None
+    return state
+
+
+async def is_session_active(page: Page) -> bool:
+    """
+    Cheaply check whether restored session is still valid, by looking for
+    login form and logout/login buttons. Unclear results count as inactive
+    session, so that login agent is run just like without saved session.
+    """
+    try:
+        state = await page.evaluate(_LOGIN_STATE_SCRIPT)
+    except Error as e:
+        logger.error("Could not check login state of the page")
+        logger.exception(e)
+        return False
+    logger.debug(f"Login state of the page: {state}")
+    if state["passwordFields"]:
+        return False
+    return state["loggedIn"] > 0 and not state["loggedOut"]
@@ -1,6 +1,7 @@
 import asyncio
 import random
 from typing import Literal
+from weakref import WeakKeyDictionary
 
 from playwright.async_api import Page, Error
 
@@ -8,10 +9,21 @@ from backend.config import settings
 from backend.database.models import WebsiteModel
 from backend.logger import get_logger
 from backend.schemas.llm_responses import InputFieldTypeEnum, ToolResult
-from backend.scrapers.page_processing import find_html_tag_v2
+from backend.schemas.models import Step, StepActionEnum
+from backend.scrapers.page_processing import (
+    find_html_tag_v2,
+    get_page_elements,
+)
 
 logger = get_logger()
-_action_lock = asyncio.Lock()
+# Actions on the same page wait for each other, different pages do not
+_action_locks: WeakKeyDictionary[Page, asyncio.Lock] = WeakKeyDictionary()
+
+
+def _get_action_lock(page: Page) -> asyncio.Lock:
+    if page not in _action_locks:
+        _action_locks[page] = asyncio.Lock()
+    return _action_locks[page]
 
 
 async def goto(page: Page, link: str, retry: int = 3) -> None:
@@ -27,7 +39,7 @@ async def goto(page: Page, link: str, retry: int = 3) -> None:
 
 
 async def click(page: Page, text: str) -> ToolResult:
-    async with _action_lock:
+    async with _get_action_lock(page):
         try:
             tag = await find_html_tag_v2(page=page, text=text)
         except Error as e:
@@ -56,7 +68,7 @@ async def fill(
     input_type: Literal["email", "password"],
     website_info: WebsiteModel,
 ) -> ToolResult:
-    async with _action_lock:
+    async with _get_action_lock(page):
         try:
             tag = await find_html_tag_v2(page=page, text=text)
         except Error as e:
@@ -87,3 +99,24 @@ async def fill(
         except TimeoutError:
             logger.error("fill was not successful, TIMEOUT")
             return ToolResult(success=False, error_code="TIMEOUT")
+
+
+async def replay_step(
+    page: Page, step: Step, website_info: WebsiteModel
+) -> ToolResult:
+    # Elements are found by their text in the latest snapshot of the page
+    await get_page_elements(page)
+    try:
+        if step.action == StepActionEnum.fill:
+            return await fill(
+                page=page,
+                text=step.html_element_attribute,
+                input_type=step.arguments.get("input_type", ""),
+                website_info=website_info,
+            )
+        return await click(page=page, text=step.html_element_attribute)
+    except Exception as e:
+        logger.error(
+            f"Could not replay step, ELEMENT_NOT_FOUND. Because of {e}"
+        )
+        return ToolResult(success=False, error_code="ELEMENT_NOT_FOUND")
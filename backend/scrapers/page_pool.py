@@ -0,0 +1,52 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from playwright.async_api import BrowserContext, Page
+
+from backend.logger import get_logger
+
+logger = get_logger()
+
+
+class PagePool:
+    """
+    Bounded pool of reusable pages belonging to a single browser context.
+    At most `size` pages are handed out at the same time, idle pages are
+    reused instead of being opened again for every job offer.
+    """
+
+    def __init__(self, context: BrowserContext, size: int) -> None:
+        self.context = context
+        self.size = max(1, size)
+        self._semaphore = asyncio.Semaphore(self.size)
+        self._idle: list[Page] = []
+
+    async def _acquire(self) -> Page:
+        while self._idle:
+            page = self._idle.pop()
+            if not page.is_closed():
+                return page
+        return await self.context.new_page()
+
+    async def _release(self, page: Page, broken: bool) -> None:
+        if page.is_closed():
+            return
+        # Page that raised might be left in unknown state, so it is not reused
+        if broken:
+            await page.close()
+            return
+        self._idle.append(page)
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        async with self._semaphore:
+            page = await self._acquire()
+            broken = False
+            try:
+                yield page
+            except BaseException:
+                broken = True
+                raise
+            finally:
+                await self._release(page, broken)
@@ -1,53 +1,160 @@
-import asyncio
 import json
 import re
-from copy import deepcopy
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import NamedTuple
+from weakref import WeakKeyDictionary, WeakSet
 
 import tiktoken
 import toon
-from bs4 import BeautifulSoup
 from devtools import pformat
-from playwright.async_api import Locator, Page, Error
+from playwright.async_api import Error, Frame, Locator, Page
 
+from backend.config import settings
 from backend.logger import get_logger
-from backend.schemas.llm_responses import HTMLElement, TextResponse
+from backend.scrapers.html_extraction import (
+    HANDLE_ATTRIBUTE,
+    ElementTable,
+    extract_elements,
+    extract_elements_from_page,
+)
+from backend.scrapers.page_view import (
+    SearchIndex,
+    build_search_index,
+    score_elements,
+    search_elements,
+    split_into_parts,
+)
+from backend.schemas.llm_responses import (
+    HTMLElement,
+    PageSnapshot,
+    TextResponse,
+)
+from backend.utils import canonicalize_url
 
 logger = get_logger()
 TIK = tiktoken.encoding_for_model("gpt-5-")
 CUTOFF_LEN = 100
-TAGS_TO_REMOVE = (
-    "head",
-    "meta",
-    "style",
-    "script",
-    "noscript",
-    "template",
-    "iframe",
-    "video",
-    "audio",
-    "map",
-    "area",
-    "embed",
-    "object",
-    "applet",
-    "track",
-    "canvas",
-    "svg",
-    "img",
-    "picture",
-    "source",
-)
+# Above that share of changed elements a full representation is sent
+MAX_DELTA_RATIO = 0.5
+# Gives every element without a handle a new one, so that elements can be
+# found with a single lookup, and returns a cheap summary of the DOM. If the
+# summary is the same as the one of a cached snapshot, the page did not
+# change. Mutation counter catches changes of attributes, which do not change
+# nodes and text, adding handles is not counted. Handles start with a random
+# prefix, so ones from a previous document do not match anything.
+_PREPARE_SNAPSHOT_SCRIPT = """
+(handleAttribute) => {
+    const key = "__autoJobAppSnapshot";
+    if (!(key in window)) {
+        Object.defineProperty(window, key, {
+            value: {
+                mutations: 0,
+                handles: 0,
+                prefix: Math.random().toString(36).slice(2, 8),
+            },
+        });
+        new MutationObserver((records) => {
+            for (const record of records) {
+                if (record.attributeName !== handleAttribute) {
+                    window[key].mutations += 1;
+                }
+            }
+        }).observe(document, {
+            subtree: true,
+            childList: true,
+            attributes: true,
+            characterData: true,
+        });
+    }
+    const state = window[key];
+    for (const element of document.querySelectorAll(
+        `:not([${handleAttribute}])`
+    )) {
+        state.handles += 1;
+        element.setAttribute(handleAttribute, `${state.prefix}-${state.handles}`);
+    }
+    const text = document.documentElement
+        ? document.documentElement.textContent
+        : "";
+    let hash = 0;
+    for (let i = 0; i < text.length; i++) {
+        hash = (Math.imul(hash, 31) + text.charCodeAt(i)) | 0;
+    }
+    return [
+        document.getElementsByTagName("*").length,
+        text.length,
+        hash,
+        state.mutations,
+    ];
+}
+"""
+
+
+# Elements matched by a job link selector can be the links, elements inside
+# them, like titles, or whole tiles with links inside. Hrefs are resolved by
+# the browser, so they are absolute.
+_JOB_LINKS_SCRIPT = """
+(elements) => elements.map((element) => {
+    const link = element.closest("a[href]") || element.querySelector("a[href]");
+    const text = (element.innerText || element.textContent || "")
+        .replace(/\\s+/g, " ")
+        .trim()
+        .slice(0, 200);
+    return [link ? link.href : null, text];
+})
+"""
+
+
+class PageView(NamedTuple):
+    # All elements of the page, in document order
+    elements: list[dict[str, str]]
+    # Elements split into parts fitting the token budget, the most relevant
+    # ones are in the first part
+    parts: list[list[dict[str, str]]]
+
+
+class JobLink(NamedTuple):
+    url: str
+    # Text of the job tile, usually with the title of the offer
+    text: str
+
+
+@dataclass
+class _Snapshot:
+    table: ElementTable
+    mapping: dict[str, int]
+    elements: list[dict[str, str]]
+    # Index of the record of every element
+    indexes: list[int]
+    # Indexes of records with a label and a handle, but without text, like
+    # icon buttons, they are not shown to the LLM, only found by search
+    label_only: list[int] = field(default_factory=list)
+    fingerprint: tuple | None = None
+    # TOON encoding of elements, created when it is first needed
+    content: str | None = None
+    # Indexes of elements in parts of the page view for every goal
+    views: dict[str, list[list[int]]] = field(default_factory=dict)
+    # Normalized fields of elements for search, created when first needed
+    search_index: SearchIndex | None = None
+
+
+# Snapshots are dropped when their page navigates or is garbage collected
+_snapshot_cache: WeakKeyDictionary[Page, _Snapshot] = WeakKeyDictionary()
+_watched_pages: WeakSet[Page] = WeakSet()
 # _tmp_data_store: list[dict[str, str | list[str]]] | None = None
-_mapping_store: dict[str, dict[str, str | list[str]]] | None = None
-_mapping_lock = asyncio.Lock()
+# Elements of the latest snapshot of every page and indexes of its records
+# by text shown to the LLM, so that agents working on different pages do not
+# overwrite each other's elements
+_mapping_stores: WeakKeyDictionary[
+    Page, tuple[ElementTable, dict[str, int]]
+] = WeakKeyDictionary()
 
 
-async def set_mapping_store(
-    mapping: dict[str, dict[str, str | list[str]]],
+def set_mapping_store(
+    page: Page, table: ElementTable, mapping: dict[str, int]
 ) -> None:
-    async with _mapping_lock:
-        global _mapping_store
-        _mapping_store = mapping
+    _mapping_stores[page] = (table, mapping)
 
 
 # def set_tmp_data_store(element: list[dict[str, str | list[str]]]) -> None:
@@ -55,110 +162,244 @@ async def set_mapping_store(
 #     tmp_data_store = element
 
 
-async def read_key_from_mapping_store(text_key: str) -> HTMLElement:
-    async with _mapping_lock:
-        if not _mapping_store:
-            raise Exception(
-                "Reading from empty tmp_data_store, this should not happen"
-            )
-        tag = _mapping_store.get(text_key, None)
-        if not tag:
-            logger.error("Tag was not found in mapping")
-            raise Exception("Tag was not found in mapping")
-        return HTMLElement.model_validate(tag)
-
-
-async def get_page_content(page: Page) -> str:
-    page_content = await page.content()
-
-    soup = BeautifulSoup(page_content, "html.parser")
-    for tag in soup(TAGS_TO_REMOVE):
-        tag.decompose()
-
-    tag_list: list[dict[str, str | list[str]]] = []
-    # Get "the most important" elements' attributes
-    for tag in soup.find_all():
-        text = tag.find(string=True, recursive=False)
-        if not text:
-            text = ""
-        elif len(text) == 1:
-            text = ""
-        data: dict[str, str | list[str]] = {}
-        if tag_id := tag.get("id"):
-            data["id"] = tag_id
-        if name := tag.get("name"):
-            data["name"] = name
-        if tag_type := tag.get("type"):
-            data["element_type"] = tag_type
-        if aria_label := tag.get("aria-label"):
-            data["aria_label"] = aria_label
-        if role := tag.get("role"):
-            data["role"] = role
-        if text:
-            data["text"] = text
-        if class_list := tag.get("class"):
-            if isinstance(class_list, list):
-                # FIXME: playwright._impl._errors.Error: Locator.count: SyntaxError: Failed to execute 'querySelectorAll' on 'Document': '.tw-w-[120px]' is not a valid selector.
-                data["class_list"] = [
-                    c.strip().replace("[", r"\[").replace("]", r"\]")
-                    for c in class_list
-                    if c.strip()
-                ]
-            else:
-                data["class_list"] = [class_list]
-
-        # If there is only class_list don't append element to the tag_list
-        if [k for k in data.keys() if k != "class_list"]:
-            data["parents_list"] = list(
-                reversed(
-                    [t.name for t in tag.parents if t.name != "[document]"]
+def read_key_from_mapping_store(page: Page, text_key: str) -> HTMLElement:
+    if page not in _mapping_stores:
+        raise Exception(
+            "Reading from empty tmp_data_store, this should not happen"
+        )
+    table, mapping = _mapping_stores[page]
+    index = mapping.get(text_key, None)
+    if index is None:
+        logger.error("Tag was not found in mapping")
+        raise Exception("Tag was not found in mapping")
+    return table.html_element(index)
+
+
+async def _prepare_snapshot(page: Page) -> tuple | None:
+    """
+    Add handles to new elements of the page and return its fingerprint
+    """
+    try:
+        state = await page.evaluate(_PREPARE_SNAPSHOT_SCRIPT, HANDLE_ATTRIBUTE)
+    except Error as e:
+        logger.warning(f"Could not get page fingerprint: {e}")
+        return None
+    return (page.url, *state)
+
+
+def _evict_on_navigation(page: Page) -> None:
+    if page in _watched_pages:
+        return
+    _watched_pages.add(page)
+
+    def evict(frame: Frame) -> None:
+        if frame == page.main_frame:
+            _snapshot_cache.pop(page, None)
+
+    page.on("framenavigated", evict)
+
+
+def _shown_text(text: str) -> str:
+    # Only text is sent to LLM/agent, cut off if it is too long
+    processed_text = re.sub(r"\s+", " ", text).strip()
+    if len(processed_text) >= CUTOFF_LEN:
+        processed_text = processed_text[0 : CUTOFF_LEN + 1] + "..."
+    return processed_text
+
+
+def _create_snapshot(table: ElementTable, page_content: str) -> _Snapshot:
+    tag_list_llm: list[dict[str, str]] = []
+    mapping: dict[str, int] = {}
+    indexes: list[int] = []
+    label_only: list[int] = []
+    for index, record in enumerate(table.records):
+        if not record.text:
+            if record.aria_label and record.handle:
+                label_only.append(index)
+                # Text of another element with the same label wins
+                mapping.setdefault(_shown_text(record.aria_label), index)
+                mapping[record.handle] = index
+            continue
+        processed_text = _shown_text(record.text)
+        tag_list_llm.append({"text": processed_text})
+        mapping[processed_text] = index
+        indexes.append(index)
+        # Handles tell apart elements with the same text
+        if record.handle:
+            mapping[record.handle] = index
+
+    # Token counts are only for comparing representations, encoding the
+    # whole page takes longer than creating the representation
+    if settings.DEBUG:
+        methods = {
+            "Raw HTML page": len(TIK.encode(page_content)),
+            "New cleaning method with json": len(
+                TIK.encode(json.dumps(tag_list_llm))
+            ),
+            "New cleaning method with toons": len(
+                TIK.encode(toon.encode(tag_list_llm))
+            ),
+        }
+        logger.debug(pformat(methods))
+    return _Snapshot(
+        table=table,
+        mapping=mapping,
+        elements=tag_list_llm,
+        indexes=indexes,
+        label_only=label_only,
+    )
+
+
+async def _get_snapshot(page: Page) -> _Snapshot:
+    fingerprint = await _prepare_snapshot(page)
+    snapshot = _snapshot_cache.get(page)
+    if fingerprint and snapshot and snapshot.fingerprint == fingerprint:
+        logger.debug(f"Page did not change, using cached snapshot: {page.url}")
+    else:
+        page_content = ""
+        if settings.EXTRACT_ELEMENTS_IN_BROWSER:
+            try:
+                table = await extract_elements_from_page(page)
+            except Error as e:
+                logger.error(
+                    "Could not read elements in the browser, using HTML"
                 )
-            )
-            data["parents"] = " ".join(data["parents_list"])
-            tag_list.append(data)
-
-    tag_list_llm: list[dict[str, str | list[str]]] = []
-    # Create list that will be sent to LLM/agent and will only include processed text
-    for elem in tag_list:
-        copied_elem: dict = deepcopy(elem)
-        copied_elem.pop("parents")
-        copied_elem.pop("parents_list")
-        tag_list_llm.append(copied_elem)
-
-    cleaned_tag_list: list[dict[str, str | list[str]]] = [
-        tag for tag in tag_list if tag.get("text")
-    ]
-    mapping = {}
-
-    # Make sure that text exists, if it exists check its length and cut if off, if it is too long
-    tag_list_llm = [tag for tag in tag_list_llm if tag.get("text")]
-    for index, tag in enumerate(tag_list_llm):
-        processed_text = re.sub(r"\s+", " ", tag.get("text", "")).strip()
-        if len(processed_text) >= CUTOFF_LEN:
-            processed_text = processed_text[0 : CUTOFF_LEN + 1] + "..."
-        tag_list_llm[index] = {"text": processed_text}
-        mapping[processed_text] = cleaned_tag_list[index]
-
-    methods = {
-        "Raw HTML page": len(TIK.encode(page_content)),
-        "Raw HTML page with certain tags removed": len(TIK.encode(str(soup))),
-        "New cleaning method with json": len(
-            TIK.encode(json.dumps(tag_list_llm))
-        ),
-        "New cleaning method with toons": len(
-            TIK.encode(toon.encode(tag_list_llm))
-        ),
-    }
-    logger.info(pformat(methods))
+                logger.exception(e)
+                page_content = await page.content()
+                table = extract_elements(page_content)
+        else:
+            page_content = await page.content()
+            table = extract_elements(page_content)
+
+        snapshot = _create_snapshot(table, page_content)
+        if fingerprint:
+            snapshot.fingerprint = fingerprint
+            _snapshot_cache[page] = snapshot
+            _evict_on_navigation(page)
 
     # set_tmp_data_store(tag_list)
-    await set_mapping_store(mapping)
+    set_mapping_store(page, snapshot.table, snapshot.mapping)
+    return snapshot
+
+
+async def get_page_elements(page: Page) -> list[dict[str, str]]:
+    """
+    Elements of the page as they are shown to the LLM, elements can be
+    later found by their text with read_key_from_mapping_store
+    """
+    return (await _get_snapshot(page)).elements
 
-    return toon.encode(tag_list_llm)
+
+async def get_page_content(page: Page) -> str:
+    snapshot = await _get_snapshot(page)
+    if snapshot.content is None:
+        snapshot.content = toon.encode(snapshot.elements)
+    return snapshot.content
+
+
+async def get_page_view(page: Page, goal: str) -> PageView:
+    """
+    Elements of the page split into parts, that fit the token budget, ranked
+    by relevance to the goal of the agent
+    """
+    snapshot = await _get_snapshot(page)
+    parts = snapshot.views.get(goal)
+    if parts is None:
+        texts = [element["text"] for element in snapshot.elements]
+        scores = score_elements(snapshot.table, snapshot.indexes, texts, goal)
+        parts = split_into_parts(
+            texts, scores, token_budget=settings.PAGE_VIEW_TOKEN_BUDGET
+        )
+        snapshot.views[goal] = parts
+    return PageView(
+        elements=snapshot.elements,
+        parts=[[snapshot.elements[i] for i in part] for part in parts],
+    )
+
+
+async def find_page_elements(
+    page: Page, query: str, limit: int
+) -> list[dict[str, str]]:
+    """
+    Elements of the page best matching the query by text, label or role,
+    they can be found by their text, like elements from get_page_elements,
+    or by their handle, which elements with only a label have
+    """
+    snapshot = await _get_snapshot(page)
+    indexes = snapshot.indexes + snapshot.label_only
+    if snapshot.search_index is None:
+        texts = [element["text"] for element in snapshot.elements]
+        texts += [""] * len(snapshot.label_only)
+        snapshot.search_index = build_search_index(
+            snapshot.table, indexes, texts
+        )
+    found = []
+    for position in search_elements(snapshot.search_index, query, limit):
+        record = snapshot.table.records[indexes[position]]
+        text = ""
+        if position < len(snapshot.elements):
+            text = snapshot.elements[position]["text"]
+        found.append(
+            {
+                "text": text,
+                "tag": record.tag,
+                "role": record.role,
+                "label": record.aria_label,
+                "handle": record.handle,
+            }
+        )
+    return found
+
+
+def get_replay_key(page: Page, text_key: str) -> str:
+    """
+    Key, by which the element can be found on later visits of the page.
+    Handles are new for every document, so text or label is used instead.
+    """
+    table, mapping = _mapping_stores.get(page, (None, {}))
+    index = mapping.get(text_key)
+    if table is None or index is None:
+        return text_key
+    record = table.records[index]
+    if text_key != record.handle:
+        return text_key
+    for text in (record.text, record.aria_label):
+        if text and mapping.get(key := _shown_text(text)) == index:
+            return key
+    return text_key
+
+
+def get_snapshot_delta(
+    snapshot: PageSnapshot, url: str, texts: list[str]
+) -> tuple[list[str], list[str]] | None:
+    """
+    Texts of elements added to and removed from the page since the snapshot,
+    None if the page is a different one or changed too much for a delta to
+    be worth it
+    """
+    if canonicalize_url(url) != canonicalize_url(snapshot.url):
+        return None
+    # Counters, as the same text, like 'Apply', can be on the page many times
+    added = Counter(texts) - Counter(snapshot.texts)
+    removed = Counter(snapshot.texts) - Counter(texts)
+    if added.total() + removed.total() > len(texts) * MAX_DELTA_RATIO:
+        return None
+    added_texts = []
+    for text in texts:
+        if added[text] > 0:
+            added[text] -= 1
+            added_texts.append(text)
+    return added_texts, list(removed.elements())
 
 
 async def find_html_tag_v2(page: Page, text: str) -> Locator | None:
-    element = await read_key_from_mapping_store(text)
+    element = read_key_from_mapping_store(page, text)
+    if element.handle:
+        locator = page.locator(f'[{HANDLE_ATTRIBUTE}="{element.handle}"]')
+        if await locator.count() == 1:
+            return locator
+        # Element was removed or rendered again since the snapshot
+        logger.warning(f"Handle of '{text}' is stale, searching by attributes")
     locator = None
 
     if element.id:
@@ -265,13 +506,40 @@ async def find_html_tag_v2(page: Page, text: str) -> Locator | None:
     return locator
 
 
+async def get_job_links(page: Page, selector: str) -> tuple[JobLink, ...]:
+    """
+    Links of all elements matching selector with their text, read in a single
+    DOM query. Urls are canonical, so links to the same offer are returned
+    once.
+    """
+    try:
+        links = await page.locator(selector).evaluate_all(_JOB_LINKS_SCRIPT)
+    except (Error, TimeoutError) as e:
+        logger.error(f"Could not read hrefs using selector '{selector}': {e}")
+        return tuple()
+
+    job_links: dict[str, JobLink] = {}
+    for url, text in links:
+        # Skips javascript: and mailto: links, which are not offers
+        if not url or not url.startswith("http"):
+            continue
+        url = canonicalize_url(url)
+        if url not in job_links or not job_links[url].text:
+            job_links[url] = JobLink(url=url, text=text)
+    return tuple(job_links.values())
+
+
 async def get_jobs_urls(
     text_response: TextResponse, page: Page
-) -> tuple[str, ...]:
+) -> tuple[tuple[JobLink, ...], str]:
+    """
+    Find job links using element picked by LLM, returns links and the
+    selector that found them, so that it can be reused on similar pages
+    """
     try:
-        tag = await read_key_from_mapping_store(text_response.text)
+        tag = read_key_from_mapping_store(page, text_response.text)
     except Exception:
-        return tuple()
+        return tuple(), ""
 
     logger.debug(f"HTML element holding job title: {pformat(tag)}")
 
@@ -297,24 +565,11 @@ async def get_jobs_urls(
         class_selector = ""
 
     if class_selector.strip():
-        a_tags = page.locator(class_selector)
-        try:
-            job_urls = tuple(
-                [
-                    href
-                    for loc in await a_tags.all()
-                    if (href := await loc.get_attribute("href"))
-                ]
-            )
-            if job_urls:
-                logger.info(
-                    f"Job urls got using classList method: {class_selector}\n{pformat(job_urls)}"
-                )
-                return job_urls
-        except TimeoutError:
-            logger.error(
-                "TimeoutError occurred while trying to retrieve job urls, using classList method"
+        if job_links := await get_job_links(page, class_selector):
+            logger.info(
+                f"Job urls got using classList method: {class_selector}\n{pformat(job_links)}"
             )
+            return job_links, class_selector
 
     start_index = len(tag.parents_list) - 1
     while start_index > 0 and tag.parents_list[start_index] != "a":
@@ -323,26 +578,13 @@ async def get_jobs_urls(
     class_selector = " ".join(tag.parents_list[0 : start_index + 1])
 
     if not class_selector.strip():
-        return tuple()
+        return tuple(), ""
 
-    a_tags = page.locator(class_selector)
-    try:
-        job_urls = tuple(
-            [
-                href
-                for loc in await a_tags.all()
-                if (href := await loc.get_attribute("href"))
-            ]
-        )
-        if job_urls:
-            logger.info(
-                f"Job urls got using parents method: {class_selector}\n{pformat(job_urls)}"
-            )
-            return job_urls
-    except TimeoutError:
-        logger.error(
-            "TimeoutError occurred while trying to retrieve job urls, using parents method"
+    if job_links := await get_job_links(page, class_selector):
+        logger.info(
+            f"Job urls got using parents method: {class_selector}\n{pformat(job_links)}"
         )
+        return job_links, class_selector
 
     logger.warning("Could not find job urls, returning empty tuple")
-    return tuple()
+    return tuple(), ""
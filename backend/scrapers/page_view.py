@@ -0,0 +1,280 @@
+import math
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import NamedTuple
+
+from backend.scrapers.html_extraction import ElementTable
+
+# Words too common in task descriptions to tell anything about elements
+STOP_WORDS = frozenset(
+    (
+        "a",
+        "an",
+        "and",
+        "are",
+        "as",
+        "be",
+        "by",
+        "do",
+        "e",
+        "for",
+        "g",
+        "if",
+        "in",
+        "is",
+        "it",
+        "not",
+        "of",
+        "on",
+        "or",
+        "that",
+        "the",
+        "this",
+        "to",
+        "use",
+        "with",
+        "you",
+    )
+)
+INTERACTIVE_TAGS = frozenset(
+    ("a", "button", "input", "select", "textarea", "option", "summary", "label")
+)
+INTERACTIVE_ROLES = frozenset(
+    (
+        "button",
+        "link",
+        "tab",
+        "menuitem",
+        "checkbox",
+        "radio",
+        "option",
+        "switch",
+        "combobox",
+        "textbox",
+    )
+)
+# Parents of an element checked for links and buttons
+INTERACTIVE_DEPTH = 2
+INTERACTIVE_BONUS = 1.0
+IN_VIEWPORT_BONUS = 0.5
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Below that similarity fuzzy matches are not returned by search
+MIN_FUZZY_RATIO = 0.7
+# Elements sharing the most trigrams with the query, that are compared with
+# it by fuzzy matching
+FUZZY_CANDIDATES = 50
+_WORD = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return [
+        word for word in _WORD.findall(text.lower()) if word not in STOP_WORDS
+    ]
+
+
+def bm25_scores(texts: list[str], query: str) -> list[float]:
+    """
+    Relevance of every text to the query, ranked with BM25, where texts of
+    page elements are the documents
+    """
+    documents = [_tokenize(text) for text in texts]
+    query_words = set(_tokenize(query))
+    if not documents or not query_words:
+        return [0.0] * len(texts)
+    average_length = sum(map(len, documents)) / len(documents) or 1
+    frequencies = Counter(
+        word for document in documents for word in set(document)
+    )
+    idf = {
+        word: math.log(
+            (len(documents) - frequencies[word] + 0.5)
+            / (frequencies[word] + 0.5)
+            + 1
+        )
+        for word in query_words
+        if frequencies[word]
+    }
+
+    scores = []
+    for document in documents:
+        counts = Counter(word for word in document if word in idf)
+        norm = K1 * (1 - B + B * len(document) / average_length)
+        scores.append(
+            sum(
+                idf[word] * count * (K1 + 1) / (count + norm)
+                for word, count in counts.items()
+            )
+        )
+    return scores
+
+
+def estimate_tokens(text: str) -> int:
+    # About four characters per token, plus separators of the TOON row,
+    # close enough to keep within budget without running the tokenizer
+    return len(text) // 4 + 2
+
+
+def split_into_parts(
+    texts: list[str], scores: list[float], token_budget: int
+) -> list[list[int]]:
+    """
+    Split elements into parts that fit the token budget, the most relevant
+    elements go to the first part. Indexes in every part are in document
+    order, so that the page still reads from top to bottom.
+    """
+    if token_budget <= 0:
+        return [list(range(len(texts)))] if texts else []
+    # Stable sort keeps document order among elements with equal scores
+    ranked = sorted(range(len(texts)), key=lambda i: -scores[i])
+    parts: list[list[int]] = []
+    part: list[int] = []
+    used = 0
+    for index in ranked:
+        tokens = estimate_tokens(texts[index])
+        if part and used + tokens > token_budget:
+            parts.append(sorted(part))
+            part, used = [], 0
+        part.append(index)
+        used += tokens
+    if part:
+        parts.append(sorted(part))
+    return parts
+
+
+def score_elements(
+    table: ElementTable, indexes: list[int], texts: list[str], goal: str
+) -> list[float]:
+    """
+    Relevance of elements to the agent's goal, elements that can be clicked
+    or filled and ones visible without scrolling are preferred
+    """
+    scores = bm25_scores(texts, goal)
+    for i, index in enumerate(indexes):
+        record = table.records[index]
+        # Text is often in a <span> inside of the link or button
+        tags = (record.tag, *table.parents_list(index)[-INTERACTIVE_DEPTH:])
+        if record.role in INTERACTIVE_ROLES or any(
+            tag in INTERACTIVE_TAGS for tag in tags
+        ):
+            scores[i] += INTERACTIVE_BONUS
+        if record.in_viewport:
+            scores[i] += IN_VIEWPORT_BONUS
+    return scores
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class SearchIndex(NamedTuple):
+    # Normalized text, label, role, tag, name and id of every element
+    fields: list[tuple[str, ...]]
+    # Positions of elements by trigrams of words in their text and label
+    trigrams: dict[str, list[int]]
+
+
+def _trigrams(text: str) -> set[str]:
+    # Words are padded, so that short words, like 'in', have trigrams too
+    return {
+        f" {word} "[i : i + 3]
+        for word in text.split()
+        for i in range(len(word))
+    }
+
+
+def build_search_index(
+    table: ElementTable, indexes: list[int], texts: list[str]
+) -> SearchIndex:
+    fields_list = []
+    trigrams = defaultdict(list)
+    for position, (index, text) in enumerate(zip(indexes, texts)):
+        record = table.records[index]
+        fields = tuple(
+            _normalize(field)
+            for field in (
+                text,
+                record.aria_label,
+                record.role,
+                record.tag,
+                record.name,
+                record.id,
+            )
+        )
+        fields_list.append(fields)
+        for trigram in _trigrams(f"{fields[0]} {fields[1]}"):
+            trigrams[trigram].append(position)
+    return SearchIndex(fields=fields_list, trigrams=dict(trigrams))
+
+
+def _fuzzy_ratio(query: str, text: str) -> float:
+    matcher = SequenceMatcher(None, query, text)
+    # Cheap upper bounds of the ratio skip most of the texts
+    if matcher.real_quick_ratio() < MIN_FUZZY_RATIO:
+        return 0.0
+    if matcher.quick_ratio() < MIN_FUZZY_RATIO:
+        return 0.0
+    ratio = matcher.ratio()
+    return ratio if ratio >= MIN_FUZZY_RATIO else 0.0
+
+
+def _exact_score(query: str, field: str) -> float:
+    if not field:
+        return 0.0
+    if field == query:
+        return 1.0
+    # Shorter fields containing the query are closer matches
+    if query in field:
+        return 0.8 + 0.2 * len(query) / len(field)
+    return 0.0
+
+
+def _fuzzy_score(query: str, field: str) -> float:
+    if not field:
+        return 0.0
+    if ratio := _fuzzy_ratio(query, field):
+        return 0.8 * ratio
+    # Query can be similar to a few words of a longer text, like 'email'
+    # to 'e-mail address'
+    words = field.split()
+    size = len(query.split())
+    return 0.7 * max(
+        (
+            _fuzzy_ratio(query, " ".join(words[i : i + size]))
+            for i in range(len(words) - size + 1)
+        ),
+        default=0.0,
+    )
+
+
+def search_elements(
+    search_index: SearchIndex, query: str, limit: int
+) -> list[int]:
+    """
+    Positions of elements best matching the query, exact matches first,
+    then ones containing the query, then similar ones. Only text and label
+    of elements sharing the most trigrams with the query are compared by
+    fuzzy matching, which is too slow for all elements of large pages.
+    """
+    query = _normalize(query)
+    if not query or limit <= 0:
+        return []
+    scores = [
+        max(_exact_score(query, field) for field in fields)
+        for fields in search_index.fields
+    ]
+    shared = Counter()
+    for trigram in _trigrams(query):
+        shared.update(search_index.trigrams.get(trigram, ()))
+    candidates = [i for i, _ in shared.most_common() if not scores[i]]
+    for i in candidates[:FUZZY_CANDIDATES]:
+        text, label = search_index.fields[i][:2]
+        scores[i] = max(_fuzzy_score(query, text), _fuzzy_score(query, label))
+
+    ranked = sorted(
+        (i for i, score in enumerate(scores) if score > 0),
+        key=lambda i: -scores[i],
+    )
+    return ranked[:limit]
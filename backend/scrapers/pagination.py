@@ -0,0 +1,182 @@
+import asyncio
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from playwright.async_api import BrowserContext, Error, Page
+
+from backend.logger import get_logger
+from backend.scrapers.page_actions import goto
+from backend.utils import canonicalize_url
+
+logger = get_logger()
+PAGE_QUERY_PARAMS = frozenset(
+    ("page", "p", "pn", "pg", "pagenumber", "page_number", "strona")
+)
+_PATH_PAGE_NUMBER = re.compile(r"/(page|strona|p)[/-](\d+)(?=/|$)", re.I)
+
+# Collects everything needed to find the next listing page in a single
+# round trip to the browser, hrefs are already absolute
+_PAGINATION_SCRIPT = """
+() => {
+    const relNext = document.querySelector(
+        'link[rel~="next"][href], a[rel~="next"][href]'
+    );
+    const current = document.querySelector('[aria-current="page"]');
+    const links = [];
+    for (const a of document.querySelectorAll("a[href]")) {
+        const text = (a.innerText || a.textContent || "").trim();
+        links.push({text: text.length <= 10 ? text : "", href: a.href});
+    }
+    return {
+        relNext: relNext ? relNext.href : null,
+        current: current ? (current.innerText || current.textContent || "").trim() : "",
+        links: links,
+    };
+}
+"""
+
+
+def get_page_number(url: str) -> int | None:
+    """
+    Page number put into the url as query parameter or path segment
+    """
+    parts = urlsplit(url)
+    for key, value in parse_qsl(parts.query):
+        if key.lower() in PAGE_QUERY_PARAMS and value.isdigit():
+            return int(value)
+    if match := _PATH_PAGE_NUMBER.search(parts.path):
+        return int(match.group(2))
+    return None
+
+
+def build_page_url(url: str, number: int) -> str | None:
+    """
+    Url of another page of the same listing, None if url has no page number
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    for i, (key, value) in enumerate(query):
+        if key.lower() in PAGE_QUERY_PARAMS and value.isdigit():
+            query[i] = (key, str(number))
+            return urlunsplit(parts._replace(query=urlencode(query)))
+    if _PATH_PAGE_NUMBER.search(parts.path):
+        path = _PATH_PAGE_NUMBER.sub(
+            lambda match: match.group(0)[: -len(match.group(2))] + str(number),
+            parts.path,
+            count=1,
+        )
+        return urlunsplit(parts._replace(path=path))
+    return None
+
+
+async def find_next_page_url(page: Page, visited: set[str]) -> str | None:
+    """
+    Find url of the next listing page using rel="next", numbered page links
+    and links with page number in the url. Only urls linked from the page
+    are returned, so pagination ends on the last page.
+    """
+    try:
+        state = await page.evaluate(_PAGINATION_SCRIPT)
+    except Error as e:
+        logger.error("Could not read pagination links of the page")
+        logger.exception(e)
+        return None
+    current = canonicalize_url(page.url)
+    # Listings can count pages in the url from 0, while numbers shown to the
+    # user start with 1
+    url_number = get_page_number(page.url)
+    if state["current"].isdigit():
+        shown_number = int(state["current"])
+    else:
+        shown_number = url_number or 1
+    next_url_number = 2 if url_number is None else url_number + 1
+    host = urlsplit(page.url).netloc
+
+    candidates = [state["relNext"]] if state["relNext"] else []
+    same_host_links = [
+        link for link in state["links"] if urlsplit(link["href"]).netloc == host
+    ]
+    candidates += [
+        link["href"]
+        for link in same_host_links
+        if link["text"] == str(shown_number + 1)
+    ]
+    candidates += [
+        link["href"]
+        for link in same_host_links
+        if get_page_number(link["href"]) == next_url_number
+    ]
+    for candidate in candidates:
+        # Skips javascript: and mailto: links, which are not pages
+        if not candidate.startswith("http"):
+            continue
+        canonical = canonicalize_url(candidate)
+        if canonical != current and canonical not in visited:
+            return candidate
+    return None
+
+
+class PagePrefetcher:
+    """
+    Loads upcoming listing pages in background tabs of the website's
+    context, so that they are ready when the crawl gets to them
+    """
+
+    def __init__(self, context: BrowserContext, size: int) -> None:
+        self.context = context
+        self.size = max(0, size)
+        self._tasks: dict[str, asyncio.Task[Page]] = {}
+
+    async def _load(self, url: str) -> Page:
+        page = await self.context.new_page()
+        try:
+            await goto(page, url)
+        except BaseException:
+            # Also closed when the crawl moved past the page and the load
+            # was cancelled
+            await page.close()
+            raise
+        return page
+
+    async def prefetch(self, urls: list[str]) -> None:
+        """
+        Start loading upcoming listing pages, pages loaded earlier that are
+        not among them are dropped, as the crawl moved past them
+        """
+        keys = {canonicalize_url(url): url for url in urls}
+        await self._discard(
+            [
+                self._tasks.pop(key)
+                for key in list(self._tasks)
+                if key not in keys
+            ]
+        )
+        for key, url in keys.items():
+            if len(self._tasks) >= self.size:
+                return
+            if key not in self._tasks:
+                self._tasks[key] = asyncio.create_task(self._load(url))
+
+    async def take(self, url: str) -> Page | None:
+        task = self._tasks.pop(canonicalize_url(url), None)
+        if not task:
+            return None
+        try:
+            return await task
+        except Exception as e:
+            logger.error(f"Could not prefetch listing page: {url}")
+            logger.exception(e)
+            return None
+
+    @staticmethod
+    async def _discard(tasks: list[asyncio.Task[Page]]) -> None:
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Page):
+                await result.close()
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        await self._discard(tasks)
@@ -0,0 +1,523 @@
+import asyncio
+import datetime
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Sequence
+from urllib.parse import urljoin
+
+from devtools import pformat
+from playwright.async_api import BrowserContext
+from sqlmodel import Session
+
+from backend.career_documents.pdf import generate_career_documents
+from backend.config import settings
+from backend.database.crud import (
+    get_job_signatures,
+    get_known_job_urls,
+    save_website_automation_steps,
+    save_website_job_link_selectors,
+    save_website_storage_state,
+)
+from backend.database.duplicates import DuplicateIndex, job_entry_signature
+from backend.database.models import UserModel, WebsiteModel
+from backend.llm.llm import token_usage_callback
+from backend.logger import get_logger
+from backend.schemas.models import JobEntry, UserNeeds, UserPreferences
+from backend.scrapers.base_scraper import BaseScraper
+from backend.scrapers.browser import BrowserManager
+from backend.scrapers.budget import BudgetTracker
+from backend.scrapers.checkpoints import CrawlCheckpoint
+from backend.scrapers.llm_scraper_v2 import LLMScraperV2
+from backend.scrapers.login_sessions import load_storage_state
+from backend.scrapers.page_actions import goto
+from backend.scrapers.request_blocking import RequestBlocker
+from backend.utils import canonicalize_url
+
+logger = get_logger()
+
+
+class _OrderedEvents:
+    """
+    Passes events of a single website to the output queue in discovery order,
+    even though job offers finish the pipeline in arbitrary order
+    """
+
+    def __init__(self, output: asyncio.Queue[str | None]) -> None:
+        self._output = output
+        self._reserved = 0
+        self._next = 0
+        self._finished: dict[int, str | None] = {}
+        self._all_finished = asyncio.Event()
+        self._all_finished.set()
+
+    def reserve(self) -> int:
+        index = self._reserved
+        self._reserved += 1
+        self._all_finished.clear()
+        return index
+
+    def finish(self, index: int, event: str | None = None) -> None:
+        self._finished[index] = event
+        while self._next in self._finished:
+            if ready := self._finished.pop(self._next):
+                self._output.put_nowait(ready)
+            self._next += 1
+        if self._next == self._reserved:
+            self._all_finished.set()
+
+    async def wait(self) -> None:
+        """
+        Wait until every reserved job offer has left the pipeline
+        """
+        await self._all_finished.wait()
+
+
+@dataclass
+class _JobItem:
+    scraper: BaseScraper
+    events: _OrderedEvents
+    checkpoint: CrawlCheckpoint
+    budget: BudgetTracker
+    index: int
+    job_url: str
+    job_entry: JobEntry | None = None
+    # Text of the offer's tile on the listing page, empty for resumed offers
+    tile_text: str = ""
+
+
+class ScrapePipeline:
+    """
+    Splits a scraping run into stages connected by bounded queues:
+    listing discovery -> detail extraction -> relevance evaluation ->
+    document generation. Every stage has its own number of workers, so slow
+    document generation does not stop the browser from visiting next offers.
+    """
+
+    def __init__(
+        self,
+        user: UserModel,
+        session: Session,
+        websites: Sequence[WebsiteModel],
+        user_preferences: UserPreferences,
+        user_needs: UserNeeds,
+        browser_manager: BrowserManager,
+        resume: bool = True,
+    ) -> None:
+        self.user = user
+        self.session = session
+        self.websites = websites
+        self.user_preferences = user_preferences
+        self.user_needs = user_needs
+        self.browser_manager = browser_manager
+        self.resume = resume
+        self._run_budget = BudgetTracker(
+            budget=user_preferences.run_budget, scope="run"
+        )
+        self._evaluation_queue: asyncio.Queue[_JobItem] = asyncio.Queue(
+            maxsize=settings.PIPELINE_QUEUE_SIZE
+        )
+        self._document_queue: asyncio.Queue[_JobItem] = asyncio.Queue(
+            maxsize=settings.PIPELINE_QUEUE_SIZE
+        )
+        self._events: asyncio.Queue[str | None] = asyncio.Queue()
+        # Offers already saved for the user or found earlier in this run, kept
+        # as canonical urls so they are skipped before any LLM call
+        self._known_job_urls: set[str] = set()
+        # Same offers posted on several job boards are recognised right after
+        # extraction, before paying for evaluation and document generation
+        self._duplicates = DuplicateIndex()
+
+    def _create_request_blocker(
+        self, website: WebsiteModel
+    ) -> RequestBlocker | None:
+        if not settings.BLOCK_REQUESTS:
+            return None
+        return RequestBlocker(
+            resource_types=settings.BLOCKED_RESOURCE_TYPES,
+            domains=settings.BLOCKED_DOMAINS,
+            allowlist=website.request_allowlist.replace(",", " ").split(),
+        )
+
+    async def _open_website(
+        self, context: BrowserContext, website: WebsiteModel
+    ) -> LLMScraperV2:
+        page = await context.new_page()
+        logger.info(website)
+        scraper = LLMScraperV2(
+            url=website.url,
+            context=context,
+            page=page,
+            website_info=website,
+            retries=self.user_preferences.retries,
+        )
+        if await scraper.login_to_page():
+            # Saved session lets next runs skip the login agent
+            save_website_storage_state(
+                session=self.session,
+                website=website,
+                storage_state=json.dumps(await context.storage_state()),
+            )
+        self._save_automation_steps(scraper)
+        return scraper
+
+    def _save_automation_steps(self, scraper: BaseScraper) -> None:
+        if not scraper.automation_steps_changed:
+            return
+        save_website_automation_steps(
+            session=self.session,
+            website=scraper.website_info,
+            automation_steps=scraper.automation_steps,
+        )
+        scraper.automation_steps_changed = False
+
+    def _save_job_link_selectors(self, scraper: BaseScraper) -> None:
+        if not scraper.job_link_selectors_changed:
+            return
+        save_website_job_link_selectors(
+            session=self.session,
+            website=scraper.website_info,
+            job_link_selectors=scraper.job_link_selectors,
+        )
+        scraper.job_link_selectors_changed = False
+
+    async def _crawl_listing_pages(
+        self,
+        scraper: BaseScraper,
+        checkpoint: CrawlCheckpoint,
+        budget: BudgetTracker,
+        events: _OrderedEvents,
+        detail_queue: asyncio.Queue[_JobItem],
+    ) -> str | None:
+        """
+        Go through listing pages and queue new job offers, returns name of the
+        budget that stopped the crawl, or None if all pages were visited
+        """
+
+        def new_item(
+            job_url: str, job_entry: JobEntry | None = None, tile_text: str = ""
+        ):
+            self._known_job_urls.add(canonicalize_url(job_url))
+            return _JobItem(
+                scraper=scraper,
+                events=events,
+                checkpoint=checkpoint,
+                budget=budget,
+                index=events.reserve(),
+                job_url=job_url,
+                job_entry=job_entry,
+                tile_text=tile_text,
+            )
+
+        page_index = checkpoint.page_index
+        if checkpoint.resumed:
+            # Offers interrupted somewhere in the pipeline are finished first
+            for job_entry in checkpoint.get_pending_documents():
+                await self._document_queue.put(
+                    new_item(job_url=job_entry.job_url, job_entry=job_entry)
+                )
+            for job_url in list(checkpoint.pending_job_urls):
+                await detail_queue.put(new_item(job_url=job_url))
+            await goto(scraper.page, checkpoint.listing_url)
+        else:
+            await scraper.navigate_to_job_listing_page()
+            self._save_automation_steps(scraper)
+
+        while not budget.exhausted():
+            checkpoint.listing_page_reached(
+                listing_url=scraper.page.url, page_index=page_index
+            )
+            job_links = await scraper.get_job_entries()
+            self._save_job_link_selectors(scraper)
+            skipped = 0
+            for job_link in job_links:
+                job_url = urljoin(scraper.page.url, job_link.url)
+                if canonicalize_url(
+                    job_url
+                ) in self._known_job_urls or checkpoint.is_processed(job_url):
+                    skipped += 1
+                    continue
+                if exhausted := budget.exhausted():
+                    return exhausted
+                budget.add_job_detail()
+                checkpoint.job_discovered(job_url)
+                await detail_queue.put(
+                    new_item(job_url=job_url, tile_text=job_link.text)
+                )
+            if skipped:
+                logger.info(f"Skipped {skipped} already known offers")
+            budget.add_listing_page()
+            # Checked before navigating, so that no agent run is wasted
+            if exhausted := budget.exhausted():
+                return exhausted
+            running = await scraper.navigate_to_next_page()
+            self._save_automation_steps(scraper)
+            if not running:
+                return None
+            page_index += 1
+        return budget.exhausted()
+
+    async def _discover_jobs(
+        self, website: WebsiteModel, semaphore: asyncio.Semaphore
+    ) -> None:
+        checkpoint = CrawlCheckpoint(
+            session=self.session,
+            user=self.user,
+            website=website,
+            resume=self.resume,
+        )
+        events = _OrderedEvents(self._events)
+        exhausted = None
+        completed = False
+        try:
+            # Every website gets its own context, so cookies and sessions of
+            # different job boards do not interfere with each other
+            async with (
+                semaphore,
+                self.browser_manager.new_context(
+                    locale="en-US",
+                    storage_state=load_storage_state(website.cookies),
+                ) as context,
+            ):
+                budget = BudgetTracker(
+                    budget=self.user_preferences.website_budget,
+                    scope="website",
+                    parent=self._run_budget,
+                )
+                token_usage_callback.set(budget.add_llm_tokens)
+                detail_queue: asyncio.Queue[_JobItem] = asyncio.Queue(
+                    maxsize=settings.PIPELINE_QUEUE_SIZE
+                )
+                # Detail extraction needs the website's browser context, so
+                # its workers live only as long as the context does
+                detail_workers = [
+                    asyncio.create_task(self._extract_jobs(detail_queue))
+                    for _ in range(max(1, settings.DETAIL_WORKERS))
+                ]
+                blocker = self._create_request_blocker(website)
+                scraper = None
+                try:
+                    if blocker:
+                        await blocker.attach(context)
+                    # Run budget could have run out while waiting for a slot
+                    if not (exhausted := budget.exhausted()):
+                        scraper = await self._open_website(
+                            context=context, website=website
+                        )
+                        exhausted = await self._crawl_listing_pages(
+                            scraper=scraper,
+                            checkpoint=checkpoint,
+                            budget=budget,
+                            events=events,
+                            detail_queue=detail_queue,
+                        )
+                    await detail_queue.join()
+                finally:
+                    if scraper:
+                        await scraper.close()
+                    for worker in detail_workers:
+                        worker.cancel()
+                    await asyncio.gather(
+                        *detail_workers, return_exceptions=True
+                    )
+                    # Offers left behind by a failed run still need to be
+                    # released, otherwise they would hold back events of this
+                    # website. They stay pending in the checkpoint.
+                    while not detail_queue.empty():
+                        item = detail_queue.get_nowait()
+                        item.events.finish(item.index)
+                        detail_queue.task_done()
+                    if blocker:
+                        logger.info(
+                            f"Requests blocked while scraping '{website.url}': "
+                            f"{pformat(blocker.stats)}"
+                        )
+                # Token budget can also run out in detail workers, which then
+                # leave remaining offers pending for the next run
+                exhausted = exhausted or budget.exhausted(count_limits=False)
+            # Evaluation and document generation do not need the browser, so
+            # the context and the slot for the next website are already freed
+            await events.wait()
+            if exhausted:
+                self._report_exhausted_budget(website=website, budget=exhausted)
+            completed = not exhausted
+        finally:
+            if completed:
+                checkpoint.finish()
+            else:
+                checkpoint.save(force=True)
+
+    def _report_exhausted_budget(
+        self, website: WebsiteModel, budget: str
+    ) -> None:
+        logger.info(f"Scraping of '{website.url}' stopped, '{budget}' ran out")
+        data = json.dumps({"website": website.url, "budget": budget})
+        self._events.put_nowait(f"event:budget\ndata:{data}\n\n")
+
+    def _is_duplicate(self, item: _JobItem) -> bool:
+        signature = job_entry_signature(item.job_entry)
+        if duplicate := self._duplicates.query(signature):
+            logger.info(
+                f"Job offer '{item.job_url}' is a duplicate of '{duplicate}'"
+            )
+            return True
+        self._duplicates.add(item.job_url, signature)
+        return False
+
+    async def _extract_jobs(self, queue: asyncio.Queue[_JobItem]) -> None:
+        while True:
+            item = await queue.get()
+            forwarded = False
+            token_usage_callback.set(item.budget.add_llm_tokens)
+            try:
+                if item.budget.exhausted(count_limits=False):
+                    # Offer stays pending in the checkpoint for the next run
+                    continue
+                item.job_entry = await item.scraper.get_job_information(
+                    item.job_url, tile_text=item.tile_text
+                )
+                if item.job_entry and not self._is_duplicate(item):
+                    await self._evaluation_queue.put(item)
+                    forwarded = True
+                else:
+                    item.checkpoint.job_processed(item.job_url)
+            except Exception as e:
+                logger.error(f"Could not extract job offer: {item.job_url}")
+                logger.exception(e)
+                item.checkpoint.job_processed(item.job_url)
+            finally:
+                if not forwarded:
+                    item.events.finish(item.index)
+                queue.task_done()
+
+    async def _evaluate_jobs(self) -> None:
+        while True:
+            item = await self._evaluation_queue.get()
+            forwarded = False
+            # Extracted offers are finished even after budget has run out,
+            # their tokens are still counted
+            token_usage_callback.set(item.budget.add_llm_tokens)
+            try:
+                if await item.scraper.evaluate_job(
+                    job_entry=item.job_entry, user_needs=self.user_needs
+                ):
+                    await self._document_queue.put(item)
+                    forwarded = True
+                    item.checkpoint.document_pending(item.job_entry)
+                else:
+                    item.checkpoint.job_processed(item.job_url)
+            except Exception as e:
+                logger.error(f"Could not evaluate job offer: {item.job_url}")
+                logger.exception(e)
+                item.checkpoint.job_processed(item.job_url)
+            finally:
+                if not forwarded:
+                    item.events.finish(item.index)
+                self._evaluation_queue.task_done()
+
+    async def _generate_documents(self) -> None:
+        while True:
+            item = await self._document_queue.get()
+            event = None
+            token_usage_callback.set(item.budget.add_llm_tokens)
+            try:
+                job_entry_model = await generate_career_documents(
+                    user=self.user,
+                    session=self.session,
+                    job_entry=item.job_entry,
+                    # Microseconds keep directories of documents generated at
+                    # the same time apart
+                    current_time=datetime.datetime.today().strftime(
+                        "%Y-%m-%d_%H:%M:%S.%f"
+                    ),
+                    cv_creation_mode=self.user_preferences.cv_creation_mode,
+                    generate_cover_letter=self.user_preferences.generate_cover_letter,
+                )
+                event = f"data:{job_entry_model.model_dump_json()}\n\n"
+                item.checkpoint.job_processed(item.job_url)
+            except Exception as e:
+                logger.error(
+                    f"Could not generate documents for job offer: {item.job_url}"
+                )
+                logger.exception(e)
+                item.checkpoint.job_processed(item.job_url)
+            finally:
+                item.events.finish(item.index, event)
+                self._document_queue.task_done()
+
+    async def _run(self) -> None:
+        semaphore = asyncio.Semaphore(max(1, settings.MAX_CONCURRENT_WEBSITES))
+        workers = [
+            asyncio.create_task(self._evaluate_jobs())
+            for _ in range(max(1, settings.EVALUATION_WORKERS))
+        ] + [
+            asyncio.create_task(self._generate_documents())
+            for _ in range(max(1, settings.DOCUMENT_WORKERS))
+        ]
+        try:
+            self._known_job_urls = get_known_job_urls(
+                session=self.session, user=self.user
+            )
+            for job_entry_id, signature in get_job_signatures(
+                session=self.session, user=self.user
+            ):
+                self._duplicates.add(f"job entry {job_entry_id}", signature)
+            results = await asyncio.gather(
+                *(
+                    self._discover_jobs(website=website, semaphore=semaphore)
+                    for website in self.websites
+                ),
+                return_exceptions=True,
+            )
+            for website, result in zip(self.websites, results):
+                if isinstance(result, Exception):
+                    logger.opt(exception=result).error(
+                        f"Scraping of '{website.url}' failed"
+                    )
+
+            # Items only move forward, so once both queues are drained in this
+            # order every job offer has left the pipeline
+            await self._evaluation_queue.join()
+            await self._document_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self._events.put_nowait(None)
+
+    async def stream(self) -> AsyncGenerator[str, Any]:
+        run = asyncio.create_task(self._run())
+        try:
+            while (event := await self._events.get()) is not None:
+                yield event
+        finally:
+            run.cancel()
+            await asyncio.gather(run, return_exceptions=True)
+
+
+async def find_job_entries(
+    user: UserModel,
+    session: Session,
+    websites: Sequence[WebsiteModel],
+    user_preferences: UserPreferences,
+    user_needs: UserNeeds,
+    browser_manager: BrowserManager,
+    resume: bool = True,
+    # auto_apply: bool,
+) -> AsyncGenerator[str, Any]:
+    if not websites:
+        yield "data:null\n\n"
+        return
+
+    pipeline = ScrapePipeline(
+        user=user,
+        session=session,
+        websites=websites,
+        user_preferences=user_preferences,
+        user_needs=user_needs,
+        browser_manager=browser_manager,
+        resume=resume,
+    )
+    async for event in pipeline.stream():
+        yield event
+
+    yield "data:null\n\n"
@@ -0,0 +1,78 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Sequence
+from urllib.parse import urlsplit
+
+from playwright.async_api import BrowserContext, Response, Route
+
+from backend.logger import get_logger
+
+logger = get_logger()
+
+
+@dataclass
+class RequestStats:
+    blocked_requests: int = 0
+    blocked_by_type: Counter[str] = field(default_factory=Counter)
+    allowed_requests: int = 0
+    # Size of aborted requests is never known, so only bytes of responses that
+    # reached the browser and reported their Content-Length are counted
+    transferred_bytes: int = 0
+
+
+def _matches_domain(host: str, domains: Sequence[str]) -> bool:
+    return any(host == d or host.endswith(f".{d}") for d in domains)
+
+
+class RequestBlocker:
+    """
+    Aborts requests for resources that get thrown away by the page processing
+    anyway (images, media, fonts, analytics, ads). Entries of the allowlist can
+    be either resource types (e.g. 'font') or domains (e.g. 'cdn.example.com'),
+    allowlisted domains are never blocked.
+    """
+
+    def __init__(
+        self,
+        resource_types: Sequence[str],
+        domains: Sequence[str],
+        allowlist: Sequence[str] = (),
+    ) -> None:
+        allowed = {
+            entry.strip().lower() for entry in allowlist if entry.strip()
+        }
+        self.resource_types = frozenset(
+            t.lower() for t in resource_types if t.lower() not in allowed
+        )
+        self.domains = tuple(
+            d.lower() for d in domains if d.lower() not in allowed
+        )
+        self.allowed_domains = tuple(allowed)
+        self.stats = RequestStats()
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        if _matches_domain(host, self.allowed_domains):
+            return False
+        return resource_type in self.resource_types or _matches_domain(
+            host, self.domains
+        )
+
+    async def _handle_route(self, route: Route) -> None:
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.stats.blocked_requests += 1
+            self.stats.blocked_by_type[request.resource_type] += 1
+            await route.abort("blockedbyclient")
+            return
+        await route.fallback()
+
+    def _handle_response(self, response: Response) -> None:
+        self.stats.allowed_requests += 1
+        if content_length := response.headers.get("content-length"):
+            if content_length.isdigit():
+                self.stats.transferred_bytes += int(content_length)
+
+    async def attach(self, context: BrowserContext) -> None:
+        await context.route("**/*", self._handle_route)
+        context.on("response", self._handle_response)
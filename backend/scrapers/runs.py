@@ -0,0 +1,189 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator
+
+from sqlmodel import Session
+
+from backend.database.crud import (
+    create_scrape_run,
+    delete_old_scrape_run_events,
+    finish_scrape_run,
+    get_scrape_run_events,
+    get_user_needs,
+    get_user_preferences,
+    get_websites,
+    interrupt_running_scrape_runs,
+    save_scrape_run_event,
+)
+from backend.database.db import engine
+from backend.database.models import UserModel
+from backend.logger import get_logger
+from backend.schemas.models import ScrapeRunStatusEnum
+from backend.scrapers.browser import BrowserManager
+from backend.scrapers.pipeline import find_job_entries
+
+logger = get_logger()
+END_OF_RUN_MESSAGE = "data:null\n\n"
+# Events of older runs of a user are deleted when a run ends
+KEPT_RUNS_WITH_EVENTS = 5
+
+
+def _with_id(event_id: int, message: str) -> str:
+    return f"id:{event_id}\n{message}"
+
+
+@dataclass
+class _ActiveRun:
+    run_id: int
+    user_id: int
+    task: asyncio.Task | None = None
+    # (event id, message) pairs, kept so that subscribers do not have to hit
+    # the database for events of a run that is still going
+    events: list[tuple[int, str]] = field(default_factory=list)
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+    finished: bool = False
+
+    def notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class ScrapeRunManager:
+    """
+    Runs scraping in background tasks, so that runs do not depend on SSE
+    connections. Every event is stored in the database with an id, so any
+    number of clients can watch a run and resume after the last event they
+    got. Only one run per user is going at a time.
+    """
+
+    def __init__(self, browser_manager: BrowserManager) -> None:
+        self.browser_manager = browser_manager
+        self._runs: dict[int, _ActiveRun] = {}
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        with Session(engine) as session:
+            interrupt_running_scrape_runs(session=session)
+
+    async def stop(self) -> None:
+        tasks = [run.task for run in self._runs.values() if run.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_active_run_id(self, user: UserModel) -> int | None:
+        for run in self._runs.values():
+            if run.user_id == user.id and not run.finished:
+                return run.run_id
+        return None
+
+    async def start_run(self, user: UserModel, resume: bool = True) -> int:
+        """
+        Start a scraping run for the user, or return id of the one that is
+        already going
+        """
+        async with self._lock:
+            if run_id := self.get_active_run_id(user):
+                return run_id
+            with Session(engine) as session:
+                run_id = create_scrape_run(session=session, user=user).id
+            run = _ActiveRun(run_id=run_id, user_id=user.id)
+            self._runs[run_id] = run
+            run.task = asyncio.create_task(self._run(run=run, resume=resume))
+            logger.info(f"Started scrape run {run_id}")
+            return run_id
+
+    def cancel_run(self, run_id: int) -> None:
+        if (run := self._runs.get(run_id)) and run.task:
+            run.task.cancel()
+
+    def _publish(self, session: Session, run: _ActiveRun, message: str) -> None:
+        event = save_scrape_run_event(
+            session=session, run_id=run.run_id, message=message
+        )
+        run.events.append((event.id, message))
+        run.notify()
+
+    async def _run(self, run: _ActiveRun, resume: bool) -> None:
+        status = ScrapeRunStatusEnum.failed
+        with Session(engine) as session:
+            try:
+                # Objects of the request's session cannot be used after the
+                # request ends, so everything is loaded again
+                user = session.get(UserModel, run.user_id)
+                async for message in find_job_entries(
+                    user=user,
+                    session=session,
+                    websites=get_websites(
+                        session=session, user=user, use_base_model=True
+                    ),
+                    user_preferences=get_user_preferences(
+                        session=session, user=user
+                    ),
+                    user_needs=get_user_needs(session=session, user=user),
+                    browser_manager=self.browser_manager,
+                    resume=resume,
+                ):
+                    if message.startswith(END_OF_RUN_MESSAGE.strip()):
+                        continue
+                    self._publish(session=session, run=run, message=message)
+                status = ScrapeRunStatusEnum.finished
+            except asyncio.CancelledError:
+                status = ScrapeRunStatusEnum.cancelled
+                raise
+            except Exception as e:
+                logger.error(f"Scrape run {run.run_id} failed")
+                logger.exception(e)
+            finally:
+                self._publish(
+                    session=session, run=run, message=END_OF_RUN_MESSAGE
+                )
+                finish_scrape_run(
+                    session=session, run_id=run.run_id, status=status
+                )
+                delete_old_scrape_run_events(
+                    session=session,
+                    user_id=run.user_id,
+                    kept_runs=KEPT_RUNS_WITH_EVENTS,
+                )
+                run.finished = True
+                run.notify()
+                # Subscribers keep their reference to the run, later ones
+                # replay events from the database
+                self._runs.pop(run.run_id, None)
+                logger.info(f"Scrape run {run.run_id} ended as '{status}'")
+
+    async def subscribe(
+        self, run_id: int, last_event_id: int = 0
+    ) -> AsyncGenerator[str, Any]:
+        """
+        Yield SSE messages of the run that come after last_event_id, until
+        the run ends
+        """
+        run = self._runs.get(run_id)
+        if not run:
+            with Session(engine) as session:
+                events = get_scrape_run_events(
+                    session=session, run_id=run_id, after_id=last_event_id
+                )
+            for event in events:
+                yield _with_id(event.id, event.message)
+            # Runs interrupted by stopping the application never got their
+            # last message
+            if not events or events[-1].message != END_OF_RUN_MESSAGE:
+                yield END_OF_RUN_MESSAGE
+            return
+
+        index = 0
+        while True:
+            # Taken before reading events, so that nothing published while
+            # events are being sent is missed
+            changed = run.changed
+            events = run.events[index:]
+            index += len(events)
+            for event_id, message in events:
+                if event_id > last_event_id:
+                    yield _with_id(event_id, message)
+            if run.finished and index == len(run.events):
+                return
+            await changed.wait()
@@ -0,0 +1,287 @@
+import html
+import json
+from typing import Any
+
+from bs4 import BeautifulSoup, Tag
+from playwright.async_api import Error, Page
+
+from backend.logger import get_logger
+
+logger = get_logger()
+JOB_POSTING_TYPE = "JobPosting"
+# Without these the offer cannot be evaluated, so the LLM is asked for them
+REQUIRED_FIELDS = (
+    "title",
+    "company_name",
+    "location",
+    "employment_type",
+    "additional_information",
+)
+# Microdata elements that keep their value in an attribute instead of text
+_MICRODATA_ATTRIBUTES = {
+    "meta": "content",
+    "link": "href",
+    "a": "href",
+    "area": "href",
+    "img": "src",
+    "time": "datetime",
+    "data": "value",
+}
+# Reads only JSON-LD scripts and the first JobPosting microdata item, so that
+# the whole page does not have to be parsed in Python
+_STRUCTURED_DATA_SCRIPT = """
+() => {
+    const scripts = document.querySelectorAll('script[type="application/ld+json"]');
+    const item = Array.from(document.querySelectorAll("[itemscope][itemtype]")).find(
+        (el) => el.getAttribute("itemtype").replace(/\\/+$/, "").endsWith("JobPosting")
+    );
+    return {
+        jsonLd: Array.from(scripts, (script) => script.textContent),
+        microdata: item ? item.outerHTML : "",
+    };
+}
+"""
+_WORK_ARRANGEMENTS = {"TELECOMMUTE": "Remote"}
+_BLOCK_TAGS = (
+    "p",
+    "div",
+    "br",
+    "li",
+    "ul",
+    "ol",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "tr",
+    "table",
+    "section",
+    "blockquote",
+)
+
+
+def _is_job_posting(item: Any) -> bool:
+    if not isinstance(item, dict):
+        return False
+    types = item.get("@type", [])
+    if isinstance(types, str):
+        types = [types]
+    # Types can be prefixed, e.g. 'schema:JobPosting' or full schema.org url
+    return any(
+        str(t).rsplit("/", 1)[-1].rsplit(":", 1)[-1] == JOB_POSTING_TYPE
+        for t in types
+    )
+
+
+def _find_job_posting(data: Any) -> dict | None:
+    if isinstance(data, list):
+        for item in data:
+            if posting := _find_job_posting(item):
+                return posting
+        return None
+    if not isinstance(data, dict):
+        return None
+    if _is_job_posting(data):
+        return data
+    if "@graph" in data:
+        return _find_job_posting(data["@graph"])
+    return None
+
+
+def _json_ld_job_posting(scripts: list[str]) -> dict | None:
+    for script in scripts:
+        try:
+            # strict=False lets through raw newlines, which are common in
+            # descriptions put into JSON-LD by hand
+            data = json.loads(script, strict=False)
+        except ValueError:
+            continue
+        if posting := _find_job_posting(data):
+            return posting
+    return None
+
+
+def _microdata_item(element: Tag) -> dict:
+    item: dict[str, Any] = {"@type": element.get("itemtype", "")}
+    for child in element.find_all(attrs={"itemprop": True}):
+        # Properties of nested items belong to them, not to this element
+        scope = child.find_parent(attrs={"itemscope": True})
+        if scope is not element:
+            continue
+        if child.has_attr("itemscope"):
+            value: Any = _microdata_item(child)
+        elif attribute := _MICRODATA_ATTRIBUTES.get(child.name):
+            value = child.get(attribute, "")
+        else:
+            value = child.get_text(" ", strip=True)
+        for name in child["itemprop"].split():
+            if name in item:
+                if not isinstance(item[name], list):
+                    item[name] = [item[name]]
+                item[name].append(value)
+            else:
+                item[name] = value
+    return item
+
+
+def _microdata_job_posting(soup: BeautifulSoup) -> dict | None:
+    for element in soup.find_all(attrs={"itemscope": True, "itemtype": True}):
+        if element["itemtype"].rstrip("/").endswith(JOB_POSTING_TYPE):
+            return _microdata_item(element)
+    return None
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, list):
+        return ", ".join(filter(None, (_text(v) for v in value)))
+    if isinstance(value, dict):
+        return _text(value.get("name", ""))
+    if value is None:
+        return ""
+    # Descriptions are HTML, sometimes additionally escaped
+    text = html.unescape(str(value))
+    if "<" in text:
+        soup = BeautifulSoup(text, "html.parser")
+        # Only block elements start new lines, inline ones, like <b>, stay
+        # part of the sentence
+        for tag in soup.find_all(_BLOCK_TAGS):
+            tag.insert_after("\n")
+        lines = (
+            " ".join(line.split()) for line in soup.get_text().splitlines()
+        )
+        text = "\n".join(filter(None, lines))
+    return text.strip()
+
+
+def _location(posting: dict) -> str:
+    locations = posting.get("jobLocation") or []
+    if not isinstance(locations, list):
+        locations = [locations]
+    names = []
+    for location in locations:
+        address = location
+        if isinstance(location, dict):
+            address = location.get("address", location)
+        if isinstance(address, dict):
+            parts = [
+                _text(address.get(key))
+                for key in (
+                    "addressLocality",
+                    "addressRegion",
+                    "addressCountry",
+                )
+            ]
+            name = ", ".join(filter(None, parts))
+        else:
+            name = _text(address)
+        if name and name not in names:
+            names.append(name)
+    if not names:
+        names.append(_text(posting.get("applicantLocationRequirements")))
+    return "; ".join(filter(None, names))
+
+
+def _salary(posting: dict) -> str:
+    salary = posting.get("baseSalary")
+    if not isinstance(salary, dict):
+        return _text(salary)
+    value = salary.get("value", {})
+    if isinstance(value, dict):
+        low, high = value.get("minValue"), value.get("maxValue")
+        amount = "-".join(str(v) for v in (low, high) if v is not None)
+        amount = amount or _text(value.get("value"))
+        unit = _text(value.get("unitText"))
+    else:
+        amount, unit = _text(value), ""
+    currency = _text(salary.get("currency"))
+    return " ".join(filter(None, (amount, currency, unit and f"per {unit}")))
+
+
+def job_posting_to_fields(posting: dict) -> dict[str, str]:
+    """
+    Map schema.org JobPosting onto fields of JobEntryResponse, fields without
+    value in the posting are left out
+    """
+    organization = posting.get("hiringOrganization") or {}
+    if not isinstance(organization, dict):
+        organization = {"name": organization}
+    requirements = [
+        _text(posting.get(key))
+        for key in (
+            "qualifications",
+            "skills",
+            "experienceRequirements",
+            "educationRequirements",
+        )
+    ]
+    description = _text(posting.get("description"))
+    if salary := _salary(posting):
+        description = f"{description}\nSalary: {salary}".strip()
+
+    fields = {
+        "title": _text(posting.get("title")),
+        "company_name": _text(organization.get("name")),
+        "company_url": _text(
+            organization.get("sameAs") or organization.get("url")
+        ),
+        "location": _location(posting),
+        "employment_type": _text(posting.get("employmentType")),
+        "work_arrangement": _WORK_ARRANGEMENTS.get(
+            _text(posting.get("jobLocationType")).upper(), ""
+        ),
+        "requirements": "\n".join(filter(None, requirements)),
+        "duties": _text(posting.get("responsibilities")),
+        "offer_benefits": _text(posting.get("jobBenefits")),
+        # Full description of the offer, which usually holds everything
+        # schema.org has no separate property for
+        "additional_information": description,
+    }
+    return {key: value for key, value in fields.items() if value}
+
+
+def extract_job_posting(page_html: str) -> dict[str, str]:
+    """
+    Fields of JobEntryResponse found in schema.org JobPosting embedded in the
+    page as JSON-LD or microdata
+    """
+    soup = BeautifulSoup(page_html, "html.parser")
+    scripts = [
+        script.get_text()
+        for script in soup.find_all("script", type="application/ld+json")
+    ]
+    try:
+        posting = _json_ld_job_posting(scripts) or _microdata_job_posting(soup)
+        return job_posting_to_fields(posting) if posting else {}
+    except Exception as e:
+        logger.error("Could not read JobPosting structured data")
+        logger.exception(e)
+        return {}
+
+
+async def get_job_posting(page: Page) -> dict[str, str]:
+    """
+    Same as extract_job_posting, but only structured data nodes are read from
+    the browser, instead of the HTML of the whole page
+    """
+    try:
+        data = await page.evaluate(_STRUCTURED_DATA_SCRIPT)
+    except Error as e:
+        logger.error("Could not read structured data of the page")
+        logger.exception(e)
+        return {}
+    try:
+        posting = _json_ld_job_posting(data["jsonLd"])
+        if posting is None and data["microdata"]:
+            item = BeautifulSoup(data["microdata"], "html.parser")
+            posting = _microdata_job_posting(item)
+        return job_posting_to_fields(posting) if posting else {}
+    except Exception as e:
+        logger.error("Could not read JobPosting structured data")
+        logger.exception(e)
+        return {}
+
+
+def get_missing_fields(fields: dict[str, str]) -> list[str]:
+    return [field for field in REQUIRED_FIELDS if not fields.get(field)]
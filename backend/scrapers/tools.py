@@ -1,36 +1,132 @@
+import asyncio
 from pprint import pformat
 from typing import Literal
-import asyncio
 
+import toon
 from agents import RunContextWrapper, function_tool
 
+from backend.config import settings
 from backend.logger import get_logger
 from backend.schemas.llm_responses import (
     ContextForLLM,
+    PageSnapshot,
     ToolResult,
 )
+from backend.schemas.models import Step, StepActionEnum
 from backend.scrapers.page_actions import click, fill
-from backend.scrapers.page_processing import get_page_content
+from backend.scrapers.page_processing import (
+    find_page_elements,
+    get_page_view,
+    get_replay_key,
+    get_snapshot_delta,
+)
+from backend.scrapers.page_view import estimate_tokens
 
 logger = get_logger()
+# Full representation of the page is kept in the agent's history, while
+# older tool results are trimmed, so that deltas always have their base
+FULL_SNAPSHOT_HEADER = "page elements representation:"
+DELTA_SNAPSHOT_HEADER = (
+    "changes since the last full representation, other elements are the same:"
+)
+# Parts after the first one do not replace the full representation
+PART_HEADER = "more page elements, part {part} of {count}:"
+MORE_PARTS_NOTE = (
+    "these are the most relevant elements, part 1 of {count}, call "
+    "get_page_data with part=2 and further to see the rest of the page"
+)
+MAX_FOUND_ELEMENTS = 8
 
 
 @function_tool
 async def get_page_data(
-    wrapper: RunContextWrapper[ContextForLLM],
+    wrapper: RunContextWrapper[ContextForLLM], part: int = 1
 ) -> ToolResult:
     """
-    Get data about all page HTML elements in a simplified form of JSON and page url
+    Get data about page HTML elements in a simplified form of JSON and page url.
+    Elements most relevant to your task are in the first part, if there are
+    more parts, they can be requested with the part parameter.
+    If the page was already represented and the url did not change, only
+    elements added and removed since that representation are returned.
+    :param part: Part of page elements to get, starting from 1
+    :type part: int
     :return: Page elements in JSON-like form and url
     :rtype: ToolResult
     """
-    logger.debug(f"'{wrapper.context.agent_name}' invoked 'get_page_data' tool")
-    result = ToolResult(
-        success=True,
-        result=f"url: {wrapper.context.page.url}\npage elements representation:\n{await get_page_content(wrapper.context.page)}",
+    logger.debug(
+        f"'{wrapper.context.agent_name}' invoked 'get_page_data' tool with params: {part =}"
     )
+    page = wrapper.context.page
+    view = await get_page_view(page, goal=wrapper.context.goal)
+    parts_count = max(len(view.parts), 1)
+    if not 1 <= part <= parts_count:
+        return ToolResult(
+            success=False,
+            error_code="WRONG_INPUT",
+            additional_information=f"Page has parts from 1 to {parts_count}",
+        )
+    if part > 1:
+        return ToolResult(
+            success=True,
+            result=f"url: {page.url}\n{PART_HEADER.format(part=part, count=parts_count)}\n"
+            f"{toon.encode(view.parts[part - 1])}",
+        )
+
+    texts = [element["text"] for element in view.elements]
+    snapshot = wrapper.context.snapshot
+    if settings.PAGE_SNAPSHOT_DELTAS and snapshot:
+        delta = get_snapshot_delta(snapshot, url=page.url, texts=texts)
+        # Deltas bigger than the budget are replaced by the ranked view
+        if delta and (
+            settings.PAGE_VIEW_TOKEN_BUDGET <= 0
+            or sum(map(estimate_tokens, delta[0]))
+            <= settings.PAGE_VIEW_TOKEN_BUDGET
+        ):
+            added, removed = delta
+            return ToolResult(
+                success=True,
+                result=f"url: {page.url}\n{DELTA_SNAPSHOT_HEADER}\n"
+                f"added elements:\n{toon.encode([{'text': t} for t in added])}\n"
+                f"removed elements:\n{toon.encode([{'text': t} for t in removed])}",
+            )
+
+    wrapper.context.snapshot = PageSnapshot(url=page.url, texts=texts)
+    elements = toon.encode(view.parts[0] if view.parts else [])
+    result = f"url: {page.url}\n{FULL_SNAPSHOT_HEADER}\n{elements}"
+    if parts_count > 1:
+        result += f"\n{MORE_PARTS_NOTE.format(count=parts_count)}"
     # logger.info(f"Tool: get_page_data, {pformat(result)}")
-    return result
+    return ToolResult(success=True, result=result)
+
+
+@function_tool
+async def find_elements(
+    wrapper: RunContextWrapper[ContextForLLM], query: str
+) -> ToolResult:
+    """
+    Find page elements matching the query by their text, label or role, for
+    example 'Sign in', 'Accept cookies' or 'button'. Only the best matches
+    are returned, so use it instead of get_page_data when you know what
+    element you are looking for. Found elements can be clicked or filled
+    using their text, or their handle if they have no text.
+    :param query: Text, label or role of the element
+    :type query: str
+    :return: Matching page elements in JSON-like form and url
+    :rtype: ToolResult
+    """
+    logger.debug(
+        f"'{wrapper.context.agent_name}' invoked 'find_elements' tool with params: {query =}"
+    )
+    page = wrapper.context.page
+    elements = await find_page_elements(
+        page, query=query, limit=MAX_FOUND_ELEMENTS
+    )
+    if not elements:
+        return ToolResult(success=False, error_code="ELEMENT_NOT_FOUND")
+    return ToolResult(
+        success=True,
+        result=f"url: {page.url}\nfound elements:\n{toon.encode(elements)}",
+    )
 
 
 @function_tool
@@ -39,7 +135,7 @@ async def click_element(
 ) -> ToolResult:
     """
     Click a given element on the page.
-    :param text: Text of the element to clik
+    :param text: Text of the element to clik, or its handle from find_elements
     :type text: str
     :return: Result of the click action
     :rtype: ToolResult
@@ -59,6 +155,16 @@ async def click_element(
     if not result:
         return ToolResult(success=False, error_code="ELEMENT_NOT_FOUND")
 
+    if result.success:
+        wrapper.context.recorded_steps.append(
+            Step(
+                action=StepActionEnum.click,
+                html_element_attribute=get_replay_key(
+                    wrapper.context.page, text
+                ),
+                page_url=wrapper.context.page.url,
+            )
+        )
     logger.info(f"'click_element' tool result:{pformat(result)}")
     return result
 
@@ -71,7 +177,7 @@ async def fill_element(
 ) -> ToolResult:
     """
     Fill a given input field.
-    :param text: Label of the input field
+    :param text: Label of the input field, or its handle from find_elements
     :type text: str
     :param input_type: Whether the input, that should be passed to input field should be user email or password. Password and email will be read from database by function.
     :type input_type: InputFieldTypeEnum
@@ -98,5 +204,18 @@ async def fill_element(
     if not result:
         return ToolResult(success=False, error_code="ELEMENT_NOT_FOUND")
 
+    if result.success:
+        # Only the type of input is recorded, credentials are read again
+        # from the database when steps are replayed
+        wrapper.context.recorded_steps.append(
+            Step(
+                action=StepActionEnum.fill,
+                html_element_attribute=get_replay_key(
+                    wrapper.context.page, text
+                ),
+                arguments={"input_type": input_type},
+                page_url=wrapper.context.page.url,
+            )
+        )
     logger.info(f"'fill_element' tool result:{pformat(result)}")
     return result
@@ -1,11 +1,31 @@
 from functools import wraps
+import re
 import time
 from typing import Callable
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
 
 from backend.logger import get_logger
 
 
 logger = get_logger()
+# Only parameters that are tracking for sure, generic ones like 'ref' can
+# select the job offer on some job boards
+TRACKING_QUERY_PARAMS = frozenset(
+    (
+        "gclid",
+        "dclid",
+        "fbclid",
+        "msclkid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "trk",
+        "trackingid",
+    )
+)
+# Fragments of single page apps, that hold the route instead of an anchor
+ROUTE_FRAGMENT_PREFIXES = ("/", "!")
 
 
 def measure_func_time(func: Callable):
@@ -20,3 +40,45 @@ def measure_func_time(func: Callable):
         return result
 
     return wrapper
+
+
+def canonicalize_url(url: str, base_url: str = "") -> str:
+    """
+    Normalize url, so that the same job offer reached through different links
+    (relative links, tracking parameters, anchors etc.) has the same address
+    """
+    parts = urlsplit(urljoin(base_url, url.strip()))
+    host = (parts.hostname or "").lower().removeprefix("www.")
+    if parts.port and (parts.scheme, parts.port) not in (
+        ("http", 80),
+        ("https", 443),
+    ):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_")
+            and key.lower() not in TRACKING_QUERY_PARAMS
+        )
+    )
+    fragment = ""
+    if parts.fragment.startswith(ROUTE_FRAGMENT_PREFIXES):
+        fragment = parts.fragment
+    return urlunsplit((parts.scheme.lower(), host, path, query, fragment))
+
+
+def url_pattern(url: str) -> str:
+    """
+    Pattern shared by urls of similar pages, like listing pages of a job
+    board, numbers in the path and query values are dropped
+    """
+    parts = urlsplit(canonicalize_url(url))
+    path = re.sub(r"\d+", "{n}", parts.path)
+    if parts.fragment:
+        path += "#" + re.sub(r"\d+", "{n}", parts.fragment)
+    query_keys = sorted({key for key, _ in parse_qsl(parts.query)})
+    if query_keys:
+        return f"{parts.netloc}{path}?{'&'.join(query_keys)}"
+    return f"{parts.netloc}{path}"
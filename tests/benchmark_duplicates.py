@@ -0,0 +1,85 @@
+"""
+Measures duplicate index lookups under load, where offers come in groups of
+near-duplicates, like the same offer posted on many boards or offers built
+from one company template, so lookups have candidates to compare:
+
+    python -m tests.benchmark_duplicates
+"""
+
+import random
+import statistics
+import time
+
+from backend.database.duplicates import (
+    BANDS,
+    ROWS,
+    DuplicateIndex,
+    minhash_signature,
+)
+
+TEMPLATES = 1_000
+VARIANTS = 100
+QUERIES = 1_000
+# Share of signature values changed in a variant, a small edit of the offer
+# changes only the values whose minimum shingle was edited
+CHANGED_SHARE = 0.08
+
+WORDS = (
+    "python java backend frontend data cloud docker kubernetes postgresql "
+    "fastapi django react team remote office senior junior tests services "
+    "pipelines security mobile android payments search maps analytics"
+).split()
+
+
+def _template(rng: random.Random, number: int) -> list[int]:
+    return minhash_signature(
+        title=f"{rng.choice(WORDS).title()} Developer {number}",
+        company_name=f"Company {number}",
+        description=" ".join(rng.choice(WORDS) for _ in range(80)),
+    )
+
+
+def _variant(rng: random.Random, signature: list[int]) -> list[int]:
+    variant = list(signature)
+    for position in rng.sample(
+        range(len(variant)), int(len(variant) * CHANGED_SHARE)
+    ):
+        variant[position] = rng.getrandbits(32)
+    return variant
+
+
+def _candidates(index: DuplicateIndex, signature: list[int]) -> int:
+    keys = set()
+    for band in range(BANDS):
+        bucket = (band, tuple(signature[band * ROWS : (band + 1) * ROWS]))
+        keys.update(index._buckets.get(bucket, ()))
+    return len(keys)
+
+
+def main() -> None:
+    rng = random.Random(0)
+    templates = [_template(rng, number) for number in range(TEMPLATES)]
+    index = DuplicateIndex()
+    for number, template in enumerate(templates):
+        for variant in range(VARIANTS):
+            index.add((number, variant), _variant(rng, template))
+
+    queries = [_variant(rng, rng.choice(templates)) for _ in range(QUERIES)]
+    times, found = [], 0
+    for signature in queries:
+        start = time.perf_counter()
+        found += index.query(signature) is not None
+        times.append(time.perf_counter() - start)
+    candidates = [_candidates(index, signature) for signature in queries]
+
+    print(f"{len(index)} entries, {QUERIES} near-duplicate queries")
+    print(f"  mean lookup    {statistics.mean(times) * 1e6:8.1f} us")
+    print(
+        f"  p99 lookup     {statistics.quantiles(times, n=100)[-1] * 1e6:8.1f} us"
+    )
+    print(f"  mean candidates {statistics.mean(candidates):7.1f}")
+    print(f"  duplicates found {found}/{QUERIES}")
+
+
+if __name__ == "__main__":
+    main()
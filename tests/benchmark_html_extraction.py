@@ -0,0 +1,68 @@
+"""
+Compares speed and output of page element extractors.
+
+Pages saved with page.content() can be given as files or directories of
+.html files, without them a generated listing page is used:
+
+    python -m tests.benchmark_html_extraction saved_pages/
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from backend.scrapers.html_extraction import EXTRACTORS
+
+ROUNDS = 5
+
+
+def _generated_listing_page(offers: int = 2000) -> str:
+    tiles = "".join(
+        f"""
+        <li class="offer-tile tw-flex tw-w-[120px]" data-id="{i}">
+            <a href="/offers/{i}" class="offer-link"><h3>Developer {i}</h3></a>
+            <div class="company"><img src="/logo/{i}.png">Company {i}</div>
+            <ul class="tags"><li>Python</li><li>Remote</li><li>B2B</li></ul>
+            <button type="button" aria-label="Save offer {i}"><svg></svg></button>
+        </li>"""
+        for i in range(offers)
+    )
+    return f"""<!DOCTYPE html><html><head><title>Jobs</title>
+        <script>{"var x = 1;" * 10000}</script></head>
+        <body><nav role="navigation"><a href="/">Home</a></nav>
+        <main><ul id="offers">{tiles}</ul></main></body></html>"""
+
+
+def _load_pages(paths: list[str]) -> dict[str, str]:
+    if not paths:
+        return {"generated listing page": _generated_listing_page()}
+    pages = {}
+    for path in map(Path, paths):
+        files = sorted(path.glob("*.html")) if path.is_dir() else [path]
+        for file in files:
+            pages[str(file)] = file.read_text(encoding="utf-8")
+    return pages
+
+
+def main(paths: list[str]) -> None:
+    for name, page in _load_pages(paths).items():
+        print(f"{name} ({len(page) / 1024 / 1024:.2f} MB)")
+        outputs = {}
+        for parser, extract in EXTRACTORS.items():
+            times = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                outputs[parser] = extract(page)
+                times.append(time.perf_counter() - start)
+            print(
+                f"  {parser:<12} {statistics.median(times) * 1000:8.1f} ms"
+                f"  {len(outputs[parser])} elements"
+            )
+        elements = [table.html_elements() for table in outputs.values()]
+        same = all(output == elements[0] for output in elements)
+        print(f"  same output: {same}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
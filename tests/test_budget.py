@@ -0,0 +1,82 @@
+import pytest
+
+from backend.schemas.models import CrawlBudget
+from backend.scrapers import budget as budget_module
+from backend.scrapers.budget import BudgetTracker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(budget_module.time, "monotonic", clock)
+    return clock
+
+
+def _website_tracker(scope: str, budget: CrawlBudget) -> BudgetTracker:
+    """
+    Website tracker, with the budget set on the given scope
+    """
+    run = BudgetTracker(
+        budget=budget if scope == "run" else CrawlBudget(), scope="run"
+    )
+    return BudgetTracker(
+        budget=budget if scope == "website" else CrawlBudget(),
+        scope="website",
+        parent=run,
+    )
+
+
+@pytest.mark.parametrize("scope", ["website", "run"])
+def test_listing_pages_limit(scope: str, clock: FakeClock):
+    tracker = _website_tracker(scope, CrawlBudget(max_listing_pages=2))
+    tracker.add_listing_page()
+    assert tracker.exhausted() is None
+    tracker.add_listing_page()
+    assert tracker.exhausted() == f"{scope}:max_listing_pages"
+    # Work that is already queued goes on
+    assert tracker.exhausted(count_limits=False) is None
+
+
+@pytest.mark.parametrize("scope", ["website", "run"])
+def test_job_details_limit(scope: str, clock: FakeClock):
+    tracker = _website_tracker(scope, CrawlBudget(max_job_details=1))
+    assert tracker.exhausted() is None
+    tracker.add_job_detail()
+    assert tracker.exhausted() == f"{scope}:max_job_details"
+    assert tracker.exhausted(count_limits=False) is None
+
+
+@pytest.mark.parametrize("scope", ["website", "run"])
+def test_llm_tokens_limit(scope: str, clock: FakeClock):
+    tracker = _website_tracker(scope, CrawlBudget(max_llm_tokens=1000))
+    tracker.add_llm_tokens(999)
+    assert tracker.exhausted() is None
+    tracker.add_llm_tokens(1)
+    assert tracker.exhausted(count_limits=False) == f"{scope}:max_llm_tokens"
+
+
+@pytest.mark.parametrize("scope", ["website", "run"])
+def test_minutes_limit(scope: str, clock: FakeClock):
+    tracker = _website_tracker(scope, CrawlBudget(max_minutes=1.5))
+    clock.now += 89
+    assert tracker.exhausted() is None
+    clock.now += 1
+    assert tracker.exhausted(count_limits=False) == f"{scope}:max_minutes"
+
+
+def test_run_budget_is_shared_by_websites(clock: FakeClock):
+    run = BudgetTracker(budget=CrawlBudget(max_job_details=2), scope="run")
+    first = BudgetTracker(budget=CrawlBudget(), scope="website", parent=run)
+    second = BudgetTracker(budget=CrawlBudget(), scope="website", parent=run)
+    first.add_job_detail()
+    second.add_job_detail()
+    assert (first.job_details, second.job_details, run.job_details) == (1, 1, 2)
+    assert first.exhausted() == second.exhausted() == "run:max_job_details"
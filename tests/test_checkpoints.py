@@ -0,0 +1,107 @@
+import datetime
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from backend.database.crud import get_crawl_checkpoint
+from backend.database.models import UserModel, WebsiteModel
+from backend.schemas.models import JobEntry
+from backend.scrapers.checkpoints import CrawlCheckpoint
+
+LISTING_URL = "https://example.com/jobs?page=3"
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture
+def user(session: Session) -> UserModel:
+    user = UserModel(
+        email="user@example.com",
+        phone_number="",
+        first_name="",
+        middle_name="",
+        surname="",
+        age=None,
+    )
+    session.add(user)
+    session.commit()
+    return user
+
+
+@pytest.fixture
+def website(session: Session, user: UserModel) -> WebsiteModel:
+    website = WebsiteModel(
+        user_id=user.id,
+        cookies="",
+        user_email="user@example.com",
+        user_password="",
+        url="https://example.com",
+    )
+    session.add(website)
+    session.commit()
+    return website
+
+
+def _job_entry(job_url: str) -> JobEntry:
+    fields = dict.fromkeys(JobEntry.model_fields, "")
+    fields.update(
+        title="Python Developer",
+        discovery_date=datetime.date(2026, 1, 1),
+        job_url=job_url,
+    )
+    return JobEntry.model_validate(fields)
+
+
+def test_checkpoint_save_resume_and_finish(
+    session: Session, user: UserModel, website: WebsiteModel
+):
+    checkpoint = CrawlCheckpoint(
+        session=session, user=user, website=website, resume=True
+    )
+    assert not checkpoint.resumed
+    checkpoint.job_discovered("https://example.com/offer/1")
+    checkpoint.job_discovered("https://example.com/offer/2")
+    checkpoint.job_discovered("https://example.com/offer/3")
+    checkpoint.job_processed("https://example.com/offer/1")
+    checkpoint.document_pending(_job_entry("https://example.com/offer/2"))
+    checkpoint.listing_page_reached(LISTING_URL, page_index=3)
+
+    resumed = CrawlCheckpoint(
+        session=session, user=user, website=website, resume=True
+    )
+    assert resumed.resumed
+    assert (resumed.listing_url, resumed.page_index) == (LISTING_URL, 3)
+    assert resumed.is_processed("https://example.com/offer/1?utm_source=x")
+    assert list(resumed.pending_job_urls) == ["https://example.com/offer/3"]
+    assert [entry.job_url for entry in resumed.get_pending_documents()] == [
+        "https://example.com/offer/2"
+    ]
+
+    resumed.finish()
+    assert get_crawl_checkpoint(session=session, website=website) is None
+    fresh = CrawlCheckpoint(
+        session=session, user=user, website=website, resume=True
+    )
+    assert not fresh.resumed
+    assert not fresh.is_processed("https://example.com/offer/1")
+
+
+def test_checkpoint_is_dropped_without_resume(
+    session: Session, user: UserModel, website: WebsiteModel
+):
+    checkpoint = CrawlCheckpoint(
+        session=session, user=user, website=website, resume=True
+    )
+    checkpoint.listing_page_reached(LISTING_URL, page_index=3)
+
+    restarted = CrawlCheckpoint(
+        session=session, user=user, website=website, resume=False
+    )
+    assert not restarted.resumed
+    assert restarted.page_index == 0
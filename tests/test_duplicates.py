@@ -0,0 +1,98 @@
+import datetime
+import json
+
+from backend.database.duplicates import (
+    DuplicateIndex,
+    job_entry_signature,
+    minhash_signature,
+)
+from backend.schemas.llm_responses import JobEntryResponse
+from backend.schemas.models import JobEntry
+from backend.scrapers.structured_data import extract_job_posting
+
+DESCRIPTION = (
+    "We are looking for a Python developer who will build and maintain "
+    "backend services written in FastAPI, design PostgreSQL schemas, write "
+    "tests with pytest and review code of other team members. Experience "
+    "with Docker, CI pipelines and cloud deployments is a strong advantage. "
+    "You will work closely with frontend and data teams on new features."
+)
+
+
+def test_duplicate_index_finds_offer_posted_on_another_board():
+    index = DuplicateIndex()
+    index.add(
+        "first board",
+        minhash_signature(
+            title="Python Developer",
+            company_name="ACME Sp. z o.o.",
+            description=DESCRIPTION,
+        ),
+    )
+    index.add(
+        "other offer",
+        minhash_signature(
+            title="Java Developer",
+            company_name="Other Company",
+            description="Spring Boot, Kafka and Kubernetes microservices.",
+        ),
+    )
+
+    # Same offer, different formatting and a few changed words
+    duplicate = minhash_signature(
+        title="PYTHON developer",
+        company_name="acme sp z o o",
+        description=DESCRIPTION.replace("strong advantage", "big plus")
+        + " Apply now!",
+    )
+    assert index.query(duplicate) == "first board"
+
+    different = minhash_signature(
+        title="Python Developer",
+        company_name="ACME Sp. z o.o.",
+        description="Data engineering with Spark, Airflow and dbt on AWS.",
+    )
+    assert index.query(different) is None
+
+
+def _structured_job_entry(url: str, posting: dict) -> JobEntry:
+    page = (
+        "<script type='application/ld+json'>"
+        + json.dumps({"@type": "JobPosting", **posting})
+        + "</script>"
+    )
+    # The same way as get_job_information builds offers from structured data
+    attributes = dict.fromkeys(JobEntryResponse.model_fields, "")
+    attributes.update(extract_job_posting(page))
+    return JobEntry(
+        **attributes, discovery_date=datetime.date.today(), job_url=url
+    )
+
+
+def test_structured_offers_with_the_same_title_are_not_duplicates():
+    company = {"name": "Google"}
+    first = _structured_job_entry(
+        "https://example.com/1",
+        {
+            "title": "Software Engineer",
+            "hiringOrganization": company,
+            "jobLocation": {"address": {"addressLocality": "Warsaw"}},
+            "description": f"<p>{DESCRIPTION}</p>",
+        },
+    )
+    second = _structured_job_entry(
+        "https://example.com/2",
+        {
+            "title": "Software Engineer",
+            "hiringOrganization": company,
+            "jobLocation": {"address": {"addressLocality": "Zurich"}},
+            "description": "<p>Build Android apps in Kotlin for Maps users, "
+            "work on offline navigation and battery usage.</p>",
+        },
+    )
+    assert not first.requirements and not second.requirements
+
+    index = DuplicateIndex()
+    index.add(first.job_url, job_entry_signature(first))
+    assert index.query(job_entry_signature(second)) is None
+    assert index.query(job_entry_signature(first)) == first.job_url
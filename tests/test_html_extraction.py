@@ -0,0 +1,103 @@
+import pytest
+
+from backend.scrapers.html_extraction import (
+    extract_elements_from_page,
+    extract_elements_html_parser,
+    extract_elements_lxml,
+)
+
+PAGE = """<!DOCTYPE html>
+<html lang="en"><head><title>Jobs</title><script>var a = "<b>";</script></head>
+<body class="home">
+    <!-- header -->
+    <header role="banner"><a href="/" aria-label="Home"><img src="l.png">Logo</a></header>
+    <nav><ul class="menu  main">
+        <li><a href="/jobs" class="link tw-w-[120px]">Jobs</a></li>
+        <li><a href="/about" class="">About&nbsp;us</a></li>
+    </ul></nav>
+    <main>
+        <div id="list">
+            <article class="tile"><!--promoted-->
+                <h2><a href="/offer/1" data-autojobapp-handle="x1-7">Python Developer</a></h2>
+                <span>Warsaw</span> &middot; <span>Remote</span>
+            </article>
+            <article class="tile">
+                <h2><a href="/offer/2"> Data Engineer </a></h2>
+                <svg><text>icon</text></svg>Krakow
+            </article>
+        </div>
+        <pre>
+
+        </pre>
+        <form><input type="text" name="q" placeholder="Search"><textarea name="m">  </textarea>
+        <button type="submit">Go</button><p>x</p></form>
+        <custom-element role="button">More</custom-element>
+    </main>
+    <noscript><p>Enable JavaScript</p></noscript>
+</body></html>
+"""
+
+
+def test_lxml_extraction_matches_html_parser():
+    expected = extract_elements_html_parser(PAGE).html_elements()
+    assert extract_elements_lxml(PAGE).html_elements() == expected
+    texts = [element.text.strip() for element in expected]
+    assert "Python Developer" in texts and "Go" in texts
+    assert "icon" not in texts and "Enable JavaScript" not in texts
+    assert expected[2].class_list == ["link", r"tw-w-\[120px\]"]
+    assert expected[2].parents == "html body nav ul li"
+    assert expected[6].text == "Python Developer"
+    assert expected[6].handle == "x1-7"
+    assert len(extract_elements_lxml("")) == 0
+
+
+def test_lxml_extraction_of_xml_declared_page():
+    page = (
+        '<?xml version="1.0" encoding="ISO-8859-2"?>\n'
+        '<html><head><meta charset="ISO-8859-2"></head>'
+        "<body><p>Kraków, Łódź</p><a href='/jobs'>Jobs</a></body></html>"
+    )
+    expected = extract_elements_html_parser(page).html_elements()
+    assert extract_elements_lxml(page).html_elements() == expected
+    assert [element.text for element in expected] == ["Kraków, Łódź", "Jobs"]
+
+
+class FakePage:
+    def __init__(self, result: dict) -> None:
+        self.result = result
+
+    async def evaluate(self, script: str, arg: list) -> dict:
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_extract_elements_from_page():
+    page = FakePage(
+        {
+            "nodes": [["html", -1], ["body", 0], ["li", 1], ["form", 1]],
+            "records": [
+                [
+                    "Jobs",
+                    "",
+                    "",
+                    "",
+                    "",
+                    "",
+                    "link tw-w-[120px]",
+                    2,
+                    "",
+                    "a",
+                    True,
+                ],
+                ["", "", "q", "text", "", "", None, 3, "", "input", False],
+                ["", "", "", "", "", "", "tile", 1, "x1-3", "li", None],
+            ],
+        }
+    )
+    table = await extract_elements_from_page(page)
+    assert table.html_elements() == (
+        extract_elements_lxml(
+            "<html><body><li><a class='link tw-w-[120px]'>Jobs</a></li>"
+            "<form><input name='q' type='text'></form></body></html>"
+        ).html_elements()
+    )
@@ -0,0 +1,29 @@
+import pytest
+from playwright.async_api import Error
+
+from backend.scrapers.login_sessions import is_session_active
+
+
+class FakePage:
+    def __init__(self, state: dict | None):
+        self.state = state
+
+    async def evaluate(self, script: str) -> dict:
+        if self.state is None:
+            raise Error("Execution context was destroyed")
+        return self.state
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("state", "active"),
+    [
+        ({"passwordFields": 0, "loggedIn": 1, "loggedOut": 0}, True),
+        ({"passwordFields": 1, "loggedIn": 1, "loggedOut": 0}, False),
+        ({"passwordFields": 0, "loggedIn": 1, "loggedOut": 1}, False),
+        ({"passwordFields": 0, "loggedIn": 0, "loggedOut": 0}, False),
+        (None, False),
+    ],
+)
+async def test_is_session_active(state: dict | None, active: bool):
+    assert await is_session_active(FakePage(state)) is active
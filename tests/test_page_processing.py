@@ -0,0 +1,74 @@
+import pytest
+from playwright.async_api import Error
+
+from backend.scrapers.page_processing import (
+    JobLink,
+    find_page_elements,
+    get_job_links,
+    get_replay_key,
+    read_key_from_mapping_store,
+)
+
+
+class FakeLocator:
+    def __init__(self, links: list[list]) -> None:
+        self.links = links
+
+    async def evaluate_all(self, script: str) -> list[list]:
+        return self.links
+
+
+class FakePage:
+    def __init__(self, links: list[list]) -> None:
+        self.links = links
+
+    def locator(self, selector: str) -> FakeLocator:
+        return FakeLocator(self.links)
+
+
+@pytest.mark.asyncio
+async def test_get_job_links():
+    page = FakePage(
+        [
+            ["https://example.com/offer/1?utm_source=list", ""],
+            ["https://example.com/offer/1", "Python Developer"],
+            ["https://example.com/offer/2#apply", "Data Engineer"],
+            [None, "Promoted"],
+            ["javascript:void(0)", "Save"],
+        ]
+    )
+    assert await get_job_links(page, ".tile") == (
+        JobLink(url="https://example.com/offer/1", text="Python Developer"),
+        JobLink(url="https://example.com/offer/2", text="Data Engineer"),
+    )
+
+
+class FakeContentPage:
+    url = "https://example.com/login"
+
+    async def evaluate(self, script: str, arg: str) -> list:
+        raise Error("Handles were added to the content below")
+
+    async def content(self) -> str:
+        return """<html><body>
+            <a href="/" data-autojobapp-handle="h-1">Home</a>
+            <button aria-label="Sign in" data-autojobapp-handle="h-2">
+                <svg></svg>
+            </button>
+            <button data-autojobapp-handle="h-3">Sign in with Google</button>
+        </body></html>"""
+
+
+@pytest.mark.asyncio
+async def test_find_page_elements_with_only_a_label():
+    page = FakeContentPage()
+    found = await find_page_elements(page, query="sign in", limit=5)
+    assert [(element["text"], element["handle"]) for element in found] == [
+        ("", "h-2"),
+        ("Sign in with Google", "h-3"),
+    ]
+    assert read_key_from_mapping_store(page, "h-2").aria_label == "Sign in"
+    # Recorded steps use keys that do not change between visits
+    assert get_replay_key(page, "h-2") == "Sign in"
+    assert get_replay_key(page, "h-3") == "Sign in with Google"
+    assert get_replay_key(page, "Home") == "Home"
@@ -0,0 +1,87 @@
+from backend.scrapers.html_extraction import extract_elements_lxml
+from backend.scrapers.page_view import (
+    build_search_index,
+    score_elements,
+    search_elements,
+    split_into_parts,
+)
+
+PAGE = """<html><body>
+    <p>We use cookies to improve our services and show you relevant ads</p>
+    <div><span>Our offices are located in many cities</span></div>
+    <button><span>Accept cookies</span></button>
+    <a href="/jobs">See all jobs</a>
+    <p>Company news and blog posts</p>
+</body></html>"""
+GOAL = "Accept cookies and go to the page with the list of all job offers"
+
+
+def test_split_into_parts():
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 40]
+    parts = split_into_parts(texts, [0.0, 2.0, 0.0, 1.0], token_budget=25)
+    assert parts == [[1, 3], [0, 2]]
+    assert split_into_parts(texts, [0.0] * 4, token_budget=0) == [[0, 1, 2, 3]]
+    assert split_into_parts([], [], token_budget=25) == []
+
+
+def test_score_elements():
+    table = extract_elements_lxml(PAGE)
+    indexes = list(range(len(table)))
+    texts = [record.text for record in table.records]
+    scores = score_elements(table, indexes, texts, goal=GOAL)
+    ranked = [texts[i] for i in sorted(indexes, key=lambda i: -scores[i])]
+    assert ranked[:2] == ["Accept cookies", "See all jobs"]
+    assert scores[texts.index("Company news and blog posts")] == 0
+
+
+def test_search_elements():
+    table = extract_elements_lxml(
+        """<html><body>
+        <a href="/login">Sign in</a>
+        <button aria-label="Sign in with Google">Google</button>
+        <p>Sign in to see offers matching your profile</p>
+        <button type="submit">Sing in</button>
+        <div role="dialog">Accept cookies</div>
+    </body></html>"""
+    )
+    indexes = list(range(len(table)))
+    texts = [record.text for record in table.records]
+    search_index = build_search_index(table, indexes, texts)
+
+    found = search_elements(search_index, "sign  IN", limit=3)
+    assert [texts[i] for i in found] == [
+        "Sign in",
+        "Google",
+        "Sign in to see offers matching your profile",
+    ]
+    # Typos are matched too, after elements containing the query
+    found = search_elements(search_index, "Sign in", limit=10)
+    assert texts[found[-1]] == "Sing in"
+    for query in ("dialog", "cokies"):
+        found = search_elements(search_index, query, limit=5)
+        assert [texts[i] for i in found] == ["Accept cookies"]
+    assert search_elements(search_index, "password", limit=5) == []
+
+
+def test_search_elements_among_many_elements():
+    offers = "".join(
+        f"<a href='/offers/{i}'>Senior Python Developer {i}</a>"
+        for i in range(500)
+    )
+    table = extract_elements_lxml(
+        f"""<html><body>
+        <input name="login" aria-label="E-mail address">
+        <button>Sing in</button>
+        {offers}
+    </body></html>"""
+    )
+    indexes = list(range(len(table)))
+    texts = [record.text for record in table.records]
+    search_index = build_search_index(table, indexes, texts)
+
+    found = search_elements(search_index, "email", limit=5)
+    assert [table.records[i].aria_label for i in found] == ["E-mail address"]
+    found = search_elements(search_index, "sign in", limit=5)
+    assert [texts[i] for i in found] == ["Sing in"]
+    found = search_elements(search_index, "python developer 42", limit=1)
+    assert [texts[i] for i in found] == ["Senior Python Developer 42"]
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from playwright.async_api import Error, Page
+
+from backend.scrapers.pagination import (
+    PagePrefetcher,
+    build_page_url,
+    find_next_page_url,
+    get_page_number,
+)
+
+
+class FakePage:
+    def __init__(self, url: str, state: dict) -> None:
+        self.url = url
+        self.state = state
+
+    async def evaluate(self, script: str) -> dict:
+        if self.state is None:
+            raise Error("Execution context was destroyed")
+        return self.state
+
+
+def test_page_number_in_query_and_path():
+    assert get_page_number("https://example.com/jobs?q=py&page=3") == 3
+    assert get_page_number("https://example.com/jobs/page/4/") == 4
+    assert get_page_number("https://example.com/jobs?q=py") is None
+
+    assert build_page_url("https://example.com/jobs?q=py&p=3", 4) == (
+        "https://example.com/jobs?q=py&p=4"
+    )
+    assert build_page_url("https://example.com/jobs/strona-2", 3) == (
+        "https://example.com/jobs/strona-3"
+    )
+    assert build_page_url("https://example.com/jobs", 2) is None
+
+
+@pytest.mark.asyncio
+async def test_find_next_page_url():
+    links = [
+        {"text": "Python Developer", "href": "https://example.com/offer/2"},
+        {"text": "1", "href": "https://example.com/jobs?page=1"},
+        {"text": "", "href": "https://example.com/jobs?page=2"},
+        {"text": "Privacy", "href": "javascript:void(0)"},
+    ]
+    page = FakePage(
+        "https://example.com/jobs",
+        {"relNext": None, "current": "", "links": links},
+    )
+    assert await find_next_page_url(page, visited=set()) == (
+        "https://example.com/jobs?page=2"
+    )
+
+    page.state["relNext"] = "https://example.com/jobs?cursor=abc"
+    assert await find_next_page_url(page, visited=set()) == (
+        "https://example.com/jobs?cursor=abc"
+    )
+
+    # Last page links only to pages that were already visited
+    page = FakePage(
+        "https://example.com/jobs?page=2",
+        {"relNext": None, "current": "2", "links": links},
+    )
+    visited = {"https://example.com/jobs", "https://example.com/jobs?page=1"}
+    assert await find_next_page_url(page, visited=visited) is None
+
+
+@pytest.mark.asyncio
+async def test_find_next_page_url_of_zero_based_listing():
+    links = [
+        {"text": "2", "href": "https://ads.example.net/jobs?page=2"},
+        {"text": "", "href": "https://example.com/jobs?page=2"},
+        {"text": "", "href": "https://example.com/jobs?page=1"},
+    ]
+    page = FakePage(
+        "https://example.com/jobs?page=0",
+        {"relNext": None, "current": "", "links": links},
+    )
+    assert await find_next_page_url(page, visited=set()) == (
+        "https://example.com/jobs?page=1"
+    )
+
+    page.state = None
+    assert await find_next_page_url(page, visited=set()) is None
+
+
+class FakeTab(Page):
+    def __init__(self, slow_urls: set[str]) -> None:
+        self.slow_urls = slow_urls
+        self.loaded = ""
+        self.closed = False
+
+    async def goto(self, url: str) -> None:
+        if url in self.slow_urls:
+            await asyncio.Event().wait()
+        self.loaded = url
+
+    async def wait_for_load_state(self, state: str) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self, slow_urls: set[str]) -> None:
+        self.slow_urls = slow_urls
+        self.tabs: list[FakeTab] = []
+
+    async def new_page(self) -> FakeTab:
+        self.tabs.append(FakeTab(self.slow_urls))
+        return self.tabs[-1]
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_drops_pages_the_crawl_moved_past():
+    url = "https://example.com/jobs?page={}"
+    context = FakeContext(slow_urls={url.format(3)})
+    prefetcher = PagePrefetcher(context=context, size=2)
+    await prefetcher.prefetch([url.format(2), url.format(3)])
+    await asyncio.sleep(0)
+    page_2, page_3 = context.tabs
+
+    # Crawl went from page 1 straight to page 4
+    await prefetcher.prefetch([url.format(5), url.format(6)])
+    assert page_2.closed and page_3.closed
+    assert await prefetcher.take(url.format(2)) is None
+
+    page_5 = await prefetcher.take(url.format(5))
+    assert page_5.loaded == url.format(5) and not page_5.closed
+    await prefetcher.close()
+    assert all(tab.closed for tab in context.tabs if tab is not page_5)
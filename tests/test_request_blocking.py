@@ -0,0 +1,43 @@
+from backend.scrapers.request_blocking import RequestBlocker
+
+PAGE = "https://jobs.example.com/offers"
+
+
+def test_blocks_resource_types():
+    blocker = RequestBlocker(resource_types=["image", "Font"], domains=[])
+    assert blocker.should_block("image", "https://jobs.example.com/logo.png")
+    assert blocker.should_block("font", "https://jobs.example.com/a.woff2")
+    assert not blocker.should_block("document", PAGE)
+    assert not blocker.should_block("script", "https://jobs.example.com/a.js")
+
+
+def test_blocks_third_party_hosts_and_their_subdomains():
+    blocker = RequestBlocker(
+        resource_types=[], domains=["google-analytics.com", "doubleclick.net"]
+    )
+    assert blocker.should_block(
+        "script", "https://www.google-analytics.com/analytics.js"
+    )
+    assert blocker.should_block("xhr", "https://doubleclick.net/collect")
+    assert blocker.should_block("xhr", "https://AD.DOUBLECLICK.NET/pixel")
+    # Only whole domain labels match
+    assert not blocker.should_block("script", "https://notdoubleclick.net/a.js")
+    assert not blocker.should_block("document", PAGE)
+
+
+def test_allowlist_of_types_and_domains():
+    blocker = RequestBlocker(
+        resource_types=["image", "font", "media"],
+        domains=["googletagmanager.com", "cdn.example.com"],
+        allowlist=[" font ", "cdn.example.com", "careers.example.org", ""],
+    )
+    assert not blocker.should_block("font", "https://fonts.example.net/a.woff")
+    assert blocker.should_block("media", "https://jobs.example.com/a.mp4")
+    assert not blocker.should_block("script", "https://cdn.example.com/app.js")
+    # Allowlisted domains are never blocked, whatever the resource type
+    assert not blocker.should_block(
+        "image", "https://img.careers.example.org/banner.png"
+    )
+    assert blocker.should_block(
+        "script", "https://www.googletagmanager.com/gtm.js"
+    )
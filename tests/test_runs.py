@@ -0,0 +1,42 @@
+from sqlmodel import Session, SQLModel, create_engine
+
+from backend.database.crud import (
+    create_scrape_run,
+    delete_old_scrape_run_events,
+    get_scrape_run_events,
+    save_scrape_run_event,
+)
+from backend.database.models import UserModel
+
+
+def test_delete_old_scrape_run_events():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        users = [
+            UserModel(
+                email=f"user{i}@example.com",
+                phone_number="",
+                first_name="",
+                middle_name="",
+                surname="",
+                age=None,
+            )
+            for i in range(2)
+        ]
+        session.add_all(users)
+        session.commit()
+        runs = [
+            create_scrape_run(session=session, user=user)
+            for user in (users[0], users[1], users[0], users[0])
+        ]
+        for run in runs:
+            save_scrape_run_event(session=session, run_id=run.id, message="a")
+
+        delete_old_scrape_run_events(
+            session=session, user_id=users[0].id, kept_runs=2
+        )
+        assert [
+            len(get_scrape_run_events(session=session, run_id=run.id))
+            for run in runs
+        ] == [0, 1, 1, 1]
@@ -0,0 +1,57 @@
+import pytest
+
+from backend.schemas.llm_responses import PageSnapshot
+from backend.scrapers.llm_scraper_v2 import TrimmingSession
+from backend.scrapers.page_processing import get_snapshot_delta
+from backend.scrapers.tools import DELTA_SNAPSHOT_HEADER, FULL_SNAPSHOT_HEADER
+
+
+def test_get_snapshot_delta():
+    texts = ["Jobs", "Apply", "Apply", "Accept cookies", "Next"]
+    snapshot = PageSnapshot(url="https://example.com/jobs#top", texts=texts)
+
+    texts = ["Jobs", "Apply", "Remote", "Apply", "Next", "Python"]
+    assert get_snapshot_delta(
+        snapshot, url="https://example.com/jobs", texts=texts
+    ) == (["Remote", "Python"], ["Accept cookies"])
+
+    # Navigation and big changes need a full representation
+    assert (
+        get_snapshot_delta(
+            snapshot, url="https://example.com/jobs?page=2", texts=texts
+        )
+        is None
+    )
+    assert (
+        get_snapshot_delta(
+            snapshot, url="https://example.com/jobs", texts=["Login"]
+        )
+        is None
+    )
+
+
+def _call(call_id: str) -> dict:
+    return {"type": "function_call", "call_id": call_id, "name": "tool"}
+
+
+def _output(call_id: str, output: str) -> dict:
+    return {
+        "type": "function_call_output",
+        "call_id": call_id,
+        "output": output,
+    }
+
+
+@pytest.mark.asyncio
+async def test_trimming_session_keeps_full_snapshot():
+    session = TrimmingSession(turns=2)
+    full = _output("1", f"url: a\n{FULL_SNAPSHOT_HEADER}\nJobs")
+    await session.add_items([_call("1"), full])
+    await session.add_items([_call("2"), _output("2", "clicked")])
+    delta = _output("3", f"url: a\n{DELTA_SNAPSHOT_HEADER}\nNext")
+    await session.add_items([_call("3"), delta])
+    assert await session.get_items() == [_call("1"), full, _call("3"), delta]
+
+    full = _output("4", f"url: b\n{FULL_SNAPSHOT_HEADER}\nOffer")
+    await session.add_items([_call("4"), full])
+    assert await session.get_items() == [_call("4"), full]
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+from playwright.async_api import Error
+
+from backend.scrapers.structured_data import (
+    extract_job_posting,
+    get_job_posting,
+    get_missing_fields,
+)
+
+JSON_LD_POSTING = {
+    "@context": "https://schema.org/",
+    "@type": "JobPosting",
+    "title": "Python Developer",
+    "description": "&lt;p&gt;Build &lt;b&gt;scrapers&lt;/b&gt;.&lt;/p&gt;",
+    "hiringOrganization": {
+        "@type": "Organization",
+        "name": "Example",
+        "sameAs": "https://example.com",
+    },
+    "jobLocation": [
+        {
+            "@type": "Place",
+            "address": {
+                "addressLocality": "Warsaw",
+                "addressCountry": "PL",
+            },
+        }
+    ],
+    "employmentType": ["FULL_TIME", "CONTRACTOR"],
+    "jobLocationType": "TELECOMMUTE",
+    "baseSalary": {
+        "@type": "MonetaryAmount",
+        "currency": "PLN",
+        "value": {"minValue": 10000, "maxValue": 15000, "unitText": "MONTH"},
+    },
+}
+
+
+def test_extract_json_ld_job_posting():
+    page = (
+        "<html><head><script type='application/ld+json'>"
+        + json.dumps({"@graph": [{"@type": "WebPage"}, JSON_LD_POSTING]})
+        + "</script></head><body></body></html>"
+    )
+    fields = extract_job_posting(page)
+    assert fields == {
+        "title": "Python Developer",
+        "company_name": "Example",
+        "company_url": "https://example.com",
+        "location": "Warsaw, PL",
+        "employment_type": "FULL_TIME, CONTRACTOR",
+        "work_arrangement": "Remote",
+        "additional_information": (
+            "Build scrapers.\nSalary: 10000-15000 PLN per MONTH"
+        ),
+    }
+    assert get_missing_fields(fields) == []
+
+
+MICRODATA_POSTING = """
+    <div itemscope itemtype="https://schema.org/JobPosting">
+        <h1 itemprop="title">Data Engineer</h1>
+        <div itemprop="hiringOrganization" itemscope
+             itemtype="https://schema.org/Organization">
+            <span itemprop="name">Example</span>
+        </div>
+        <div itemprop="jobLocation" itemscope itemtype="https://schema.org/Place">
+            <div itemprop="address" itemscope
+                 itemtype="https://schema.org/PostalAddress">
+                <span itemprop="addressLocality">Krakow</span>
+            </div>
+        </div>
+        <div itemprop="description">Move data around</div>
+    </div>
+"""
+
+
+class FakePage:
+    def __init__(self, json_ld: list[str], microdata: str):
+        self.data = {"jsonLd": json_ld, "microdata": microdata}
+
+    async def evaluate(self, script: str) -> dict:
+        if self.data is None:
+            raise Error("Execution context was destroyed")
+        return self.data
+
+
+def test_extract_microdata_job_posting():
+    fields = extract_job_posting(MICRODATA_POSTING)
+    assert fields == {
+        "title": "Data Engineer",
+        "company_name": "Example",
+        "location": "Krakow",
+        "additional_information": "Move data around",
+    }
+    assert get_missing_fields(fields) == ["employment_type"]
+    assert (
+        extract_job_posting("<script type='application/ld+json'>{</script>")
+        == {}
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_job_posting_from_structured_data_nodes():
+    page = FakePage([json.dumps(JSON_LD_POSTING)], MICRODATA_POSTING)
+    assert (await get_job_posting(page))["title"] == "Python Developer"
+
+    page = FakePage(["{"], MICRODATA_POSTING)
+    assert await get_job_posting(page) == extract_job_posting(MICRODATA_POSTING)
+
+    page.data = None
+    assert await get_job_posting(page) == {}
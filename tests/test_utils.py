@@ -7,6 +7,7 @@ from backend.database.models import WebsiteModel
 from backend.logger import get_logger
 from backend.scrapers.llm_scraper_v2 import ContextForLLM, get_page_data
 from backend.scrapers.page_actions import goto
+from backend.utils import canonicalize_url, url_pattern
 
 logger = get_logger()
 
@@ -33,3 +34,48 @@ async def test_get_page_data():
             "",
         )
         logger.info(result)
+
+
+def test_canonicalize_url():
+    base_url = "https://www.example.com/jobs?page=2"
+    assert (
+        canonicalize_url(
+            "/offer/123/?utm_source=x&b=2&a=1&gclid=abc#details", base_url
+        )
+        == "https://example.com/offer/123?a=1&b=2"
+    )
+    assert canonicalize_url("HTTPS://Example.com:443/offer/123/") == (
+        "https://example.com/offer/123"
+    )
+    assert canonicalize_url("http://example.com:8080") == (
+        "http://example.com:8080/"
+    )
+
+
+def test_canonicalize_url_keeps_offer_params_and_routes():
+    # Generic parameters can select the offer, so they are kept
+    assert canonicalize_url("https://example.com/job?ref=123&fbclid=x") == (
+        "https://example.com/job?ref=123"
+    )
+    assert canonicalize_url("https://example.com/jobs?searchId=7") != (
+        canonicalize_url("https://example.com/jobs?searchId=8")
+    )
+    # Single page apps keep the route in the fragment
+    assert canonicalize_url("https://example.com/#/offers/1?utm_source=x") == (
+        "https://example.com/#/offers/1?utm_source=x"
+    )
+    assert canonicalize_url("https://example.com/#!/offers/1") != (
+        canonicalize_url("https://example.com/#!/offers/2")
+    )
+    assert url_pattern("https://example.com/#!/offers/1") == (
+        "example.com/#!/offers/{n}"
+    )
+
+
+def test_url_pattern():
+    assert url_pattern("https://www.example.com/jobs/page/2?sort=new&q=py") == (
+        url_pattern("https://example.com/jobs/page/3/?q=java&sort=old")
+    )
+    assert url_pattern("https://example.com/jobs/page/2?q=py") == (
+        "example.com/jobs/page/{n}?q"
+    )